@@ -0,0 +1,34 @@
+"""
+Gemini Clients
+Configures the Gemini SDK once and shares model handles across agents
+"""
+
+import os
+import functools
+import google.generativeai as genai
+
+
+@functools.lru_cache(maxsize=None)
+def configure():
+    """Configure the Gemini SDK with the API key (only the first call does work)"""
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(name):
+    """
+    Get the shared handle for a Gemini model
+
+    Every agent prompt asks for JSON, so models are created in JSON output mode.
+
+    Args:
+        name: Model name, e.g. 'gemini-2.5-flash'
+
+    Returns:
+        google.generativeai GenerativeModel
+    """
+    configure()
+    return genai.GenerativeModel(
+        name,
+        generation_config={'response_mime_type': 'application/json'}
+    )
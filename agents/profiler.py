@@ -3,16 +3,16 @@ Profiler Agent
 Analyzes user descriptions and creates structured research profiles
 """
 
-import os
-import json
-import google.generativeai as genai
+import orjson
+
+from agents._clients import get_model
 
 
 class ProfilerAgent:
     def __init__(self):
         """Initialize Profiler Agent with Gemini API"""
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        # Shared JSON-mode model, so profiles parse without extraction
+        self.model = get_model('gemini-2.5-flash')
 
     def analyze_description(self, description, experience_level=None):
         """
@@ -68,22 +68,14 @@ Return ONLY the JSON object, no other text."""
         try:
             response = self.model.generate_content(prompt)
 
-            # Parse JSON from response
-            content = response.text
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-
-            if json_start >= 0 and json_end > json_start:
-                profile_json = content[json_start:json_end]
-                profile = json.loads(profile_json)
+            # Response is JSON (see generation_config)
+            profile = orjson.loads(response.text)
 
-                # Override expertise_level if provided
-                if experience_level:
-                    profile['expertise_level'] = experience_level
+            # Override expertise_level if provided
+            if experience_level:
+                profile['expertise_level'] = experience_level
 
-                return profile
-            else:
-                raise ValueError("No valid JSON found in response")
+            return profile
 
         except Exception as e:
             print(f"Error analyzing profile: {str(e)}")
@@ -172,17 +164,9 @@ Return ONLY the JSON object, no other text."""
         try:
             response = self.model.generate_content(prompt)
 
-            # Parse JSON from response
-            content = response.text
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-
-            if json_start >= 0 and json_end > json_start:
-                profile_json = content[json_start:json_end]
-                profile = json.loads(profile_json)
-                return profile
-            else:
-                raise ValueError("No valid JSON found in response")
+            # Response is JSON (see generation_config)
+            profile = orjson.loads(response.text)
+            return profile
 
         except Exception as e:
             print(f"Error analyzing scholar profile: {str(e)}")
@@ -3,17 +3,92 @@ Reader Agent
 Analyzes research papers and generates follow-up research ideas
 """
 
-import os
+import re
 import json
-import google.generativeai as genai
+import orjson
+
+from agents._clients import get_model
+from utils import llm_cache
+from utils.text import keywords
+
+# Paper text sent for extraction is compressed to at most this many characters
+PAPER_CHAR_BUDGET = 12000
+
+_BACK_MATTER_RE = re.compile(r'\n\s*(?:References|Bibliography|Acknowledge?ments?)\b', re.IGNORECASE)
+_CONCLUSION_RE = re.compile(r'\n\s*(?:\d+\.?\s*)?(?:Conclusions?|Concluding Remarks)\b', re.IGNORECASE)
+_CAPTION_LINE_RE = re.compile(r'^\s*(?:Figure|Fig\.|Table)\s*\d+.*$', re.IGNORECASE | re.MULTILINE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Decodes one JSON value at a time out of a partially streamed response
+_JSON_DECODER = json.JSONDecoder()
+
+# Static instructions come first in every prompt and the paper-specific
+# content last, so the shared prefix can be reused by provider-side caching
+EXTRACTION_PREFIX = """You are a research analyst. Analyze the research paper given after these instructions and extract key information.
+
+Please extract and return the following in JSON format:
+1. summary: Array of 3-4 bullet points summarizing the paper's key contributions (as array of strings)
+2. methodology: Array of 2-4 bullet points describing the methods/techniques used (as array of strings)
+3. concepts: List of EXACTLY 5-7 MOST IMPORTANT key concepts, ordered by importance (most important first)
+   - The first concept should be the CORE/MAIN concept or methodology of the paper
+   - Following concepts should be supporting concepts, techniques, or domains
+   - Keep concepts concise (2-4 words each)
+4. findings: List of 3-5 main findings or results (as strings)
+5. limitations: List of limitations mentioned by authors (as strings)
+6. datasets: List of datasets mentioned in the paper (as strings)
+7. future_work: List of future work suggestions mentioned by authors (as strings)
+
+Return ONLY valid JSON with these fields. Example format:
+{
+  "summary": ["This paper presents a novel transformer architecture for NLP tasks", "Achieves state-of-the-art results on machine translation benchmarks", "Introduces self-attention mechanism to replace recurrent layers"],
+  "methodology": ["Uses multi-head attention mechanism with 8 parallel attention layers", "Trained on WMT 2014 English-German dataset with 4.5M sentence pairs", "Applied layer normalization and residual connections"],
+  "concepts": ["transformer architecture", "attention mechanism", "natural language processing", "self-attention", "encoder-decoder"],
+  "findings": ["The model achieves...", ...],
+  "limitations": ["Limited to...", ...],
+  "datasets": ["ImageNet", ...],
+  "future_work": ["Extending to...", ...]
+}"""
+
+IDEAS_PREFIX = """You are a research advisor helping generate novel research ideas based on a paper.
+
+Generate 8-10 follow-up research ideas that could extend the work of the paper described after these instructions. Each idea should:
+- Build on the paper's contributions
+- Address limitations or explore new directions
+- Align with user's topics of interest where possible
+- Be specific and actionable
+
+For each idea, provide:
+1. title: A concise, descriptive title (5-10 words)
+2. description: A 2-3 sentence description of the research idea
+3. rationale: Why this is an interesting research direction (1-2 sentences)
+4. topic_tags: List of relevant topics from user's interests that match this idea
+
+Return ONLY valid JSON as an array of ideas. Example format:
+[
+  {
+    "title": "Applying Transformers to Time Series Forecasting",
+    "description": "Extend the transformer architecture to multivariate time series prediction...",
+    "rationale": "While transformers excel at sequence modeling...",
+    "topic_tags": ["Machine Learning", "Time Series"]
+  },
+  ...
+]"""
 
 
 class ReaderAgent:
     def __init__(self):
         """Initialize Reader Agent with Gemini API"""
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-
+        # JSON output mode: responses parse directly, with no prose to strip
+        self.model = get_model('gemini-2.5-flash')
+        # Steps of the current analyze_paper call that fell back to defaults
+        self.fallbacks = []
+
+    @llm_cache.cached_method(
+        'reader.analyze_paper',
+        cache_if=lambda result: result['ideas'],
+        models=('model',),
+        depends_on=(EXTRACTION_PREFIX, IDEAS_PREFIX)
+    )
     def analyze_paper(self, paper_text, topics):
         """
         Analyze paper and generate research ideas
@@ -53,50 +128,19 @@ class ReaderAgent:
         Returns:
             Dictionary with extracted information
         """
-        prompt = f"""You are a research analyst. Analyze this research paper and extract key information.
+        prompt = f"""{EXTRACTION_PREFIX}
 
 Paper text:
-{paper_text[:15000]}
-
-Please extract and return the following in JSON format:
-1. summary: Array of 3-4 bullet points summarizing the paper's key contributions (as array of strings)
-2. methodology: Array of 2-4 bullet points describing the methods/techniques used (as array of strings)
-3. concepts: List of EXACTLY 5-7 MOST IMPORTANT key concepts, ordered by importance (most important first)
-   - The first concept should be the CORE/MAIN concept or methodology of the paper
-   - Following concepts should be supporting concepts, techniques, or domains
-   - Keep concepts concise (2-4 words each)
-4. findings: List of 3-5 main findings or results (as strings)
-5. limitations: List of limitations mentioned by authors (as strings)
-6. datasets: List of datasets mentioned in the paper (as strings)
-7. future_work: List of future work suggestions mentioned by authors (as strings)
-
-Return ONLY valid JSON with these fields. Example format:
-{{
-  "summary": ["This paper presents a novel transformer architecture for NLP tasks", "Achieves state-of-the-art results on machine translation benchmarks", "Introduces self-attention mechanism to replace recurrent layers"],
-  "methodology": ["Uses multi-head attention mechanism with 8 parallel attention layers", "Trained on WMT 2014 English-German dataset with 4.5M sentence pairs", "Applied layer normalization and residual connections"],
-  "concepts": ["transformer architecture", "attention mechanism", "natural language processing", "self-attention", "encoder-decoder"],
-  "findings": ["The model achieves...", ...],
-  "limitations": ["Limited to...", ...],
-  "datasets": ["ImageNet", ...],
-  "future_work": ["Extending to...", ...]
-}}"""
+{self._compress_paper(paper_text)}"""
 
         try:
-            response = self.model.generate_content(prompt)
-
-            # Parse JSON from response
-            content = response.text
-            # Extract JSON from response (handle cases where Gemini adds explanation)
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                content = content[json_start:json_end]
-
-            extraction = json.loads(content)
+            # Response is JSON (see generation_config)
+            extraction = llm_cache.cached_generate(self.model, prompt, parse=orjson.loads)
             return extraction
 
         except Exception as e:
             print(f"Error in concept extraction: {e}")
+            self.fallbacks.append('concept extraction')
             return {
                 'summary': [],
                 'methodology': [],
@@ -107,6 +151,39 @@ Return ONLY valid JSON with these fields. Example format:
                 'future_work': []
             }
 
+    def _compress_paper(self, paper_text):
+        """
+        Shrink paper text before extraction by dropping content with no signal
+        for the prompt: references, acknowledgements, figure/table captions
+        and repeated whitespace. When still over budget, keeps the start of
+        the paper (abstract, introduction) plus the conclusion.
+
+        Returns:
+            Compressed text of at most PAPER_CHAR_BUDGET characters
+        """
+        text = paper_text
+
+        # Cut back matter; only past the first third so a table of contents
+        # or an early mention of "References" doesn't cut the body
+        for match in _BACK_MATTER_RE.finditer(text):
+            if match.start() > len(text) // 3:
+                text = text[:match.start()]
+                break
+
+        text = _CAPTION_LINE_RE.sub('', text)
+
+        # Split off the conclusion so it survives truncation
+        conclusion = ''
+        matches = list(_CONCLUSION_RE.finditer(text))
+        if matches and matches[-1].start() > len(text) // 2:
+            conclusion = text[matches[-1].start():]
+            text = text[:matches[-1].start()]
+
+        conclusion = _WHITESPACE_RE.sub(' ', conclusion).strip()[:PAPER_CHAR_BUDGET // 4]
+        body = _WHITESPACE_RE.sub(' ', text).strip()[:PAPER_CHAR_BUDGET - len(conclusion) - 2]
+
+        return f"{body}\n\n{conclusion}" if conclusion else body
+
     def _match_user_topics(self, paper_text, extraction, topics):
         """
         Match user-selected topics with paper content to find relevant interests
@@ -126,17 +203,13 @@ Return ONLY valid JSON with these fields. Example format:
         paper_context = " ".join(extraction.get('summary', []))
         paper_concepts = " ".join(extraction.get('concepts', []))
         combined_context = f"{paper_context} {paper_concepts}".lower()
+        context_keywords = keywords(combined_context)
 
         matched_topics = []
 
         for topic in topics:
-            topic_lower = topic.lower()
-            topic_words = topic_lower.split()
-
-            # Check if topic or its words appear in paper context
-            if topic_lower in combined_context:
-                matched_topics.append(topic)
-            elif any(word in combined_context for word in topic_words if len(word) > 3):
+            # Check if topic or its keywords appear in paper context
+            if topic.lower() in combined_context or keywords(topic) & context_keywords:
                 matched_topics.append(topic)
 
         # Limit to top 5 matched topics
@@ -149,60 +222,42 @@ Return ONLY valid JSON with these fields. Example format:
         Returns:
             List of idea dictionaries
         """
+        summary = extraction.get('summary', '')
+        concepts_str = ", ".join(extraction.get('concepts', [])[:10])
+        findings_str = ", ".join(extraction.get('findings', []))
+        limitations_str = ", ".join(extraction.get('limitations', []))
+        future_work_str = ", ".join(extraction.get('future_work', []))
         topics_str = ", ".join(topics)
 
-        prompt = f"""You are a research advisor helping generate novel research ideas based on a paper.
+        prompt = f"""{IDEAS_PREFIX}
 
-Paper Summary: {extraction.get('summary', '')}
+Paper Summary: {summary}
 
-Key Concepts: {', '.join(extraction.get('concepts', [])[:10])}
+Key Concepts: {concepts_str}
 
-Main Findings: {', '.join(extraction.get('findings', []))}
+Main Findings: {findings_str}
 
-Limitations: {', '.join(extraction.get('limitations', []))}
+Limitations: {limitations_str}
 
-Future Work Suggested: {', '.join(extraction.get('future_work', []))}
+Future Work Suggested: {future_work_str}
 
-User's Research Interests: {topics_str}
-
-Generate 8-10 follow-up research ideas that could extend this work. Each idea should:
-- Build on the paper's contributions
-- Address limitations or explore new directions
-- Align with user's topics of interest where possible
-- Be specific and actionable
-
-For each idea, provide:
-1. title: A concise, descriptive title (5-10 words)
-2. description: A 2-3 sentence description of the research idea
-3. rationale: Why this is an interesting research direction (1-2 sentences)
-4. topic_tags: List of relevant topics from user's interests that match this idea
+User's Research Interests: {topics_str}"""
 
-Return ONLY valid JSON as an array of ideas. Example format:
-[
-  {{
-    "title": "Applying Transformers to Time Series Forecasting",
-    "description": "Extend the transformer architecture to multivariate time series prediction...",
-    "rationale": "While transformers excel at sequence modeling...",
-    "topic_tags": ["Machine Learning", "Time Series"]
-  }},
-  ...
-]"""
+        ideas = []
+        cache_key = llm_cache.cache_key(self.model, prompt)
 
         try:
-            response = self.model.generate_content(prompt)
-
-            # Parse JSON from response
-            content = response.text
-            # Extract JSON array from response
-            json_start = content.find('[')
-            json_end = content.rfind(']') + 1
-            if json_start != -1 and json_end > json_start:
-                content = content[json_start:json_end]
-
-            ideas = json.loads(content)
-
-            # Ensure each idea has required fields
-            for idea in ideas:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                chunks = [cached]
+            else:
+                # Stream the response and parse each idea as soon as it is
+                # complete, overlapping parsing with generation
+                response = self.model.generate_content(prompt, stream=True)
+                chunks = self._record_chunks((chunk.text for chunk in response if chunk.parts), cache_key)
+
+            for idea in self._iter_json_array(chunks):
+                # Ensure each idea has required fields
                 if 'title' not in idea:
                     idea['title'] = 'Untitled Idea'
                 if 'description' not in idea:
@@ -211,9 +266,72 @@ Return ONLY valid JSON as an array of ideas. Example format:
                     idea['rationale'] = ''
                 if 'topic_tags' not in idea:
                     idea['topic_tags'] = []
-
-            return ideas
+                ideas.append(idea)
 
         except Exception as e:
+            # Keep any ideas that arrived before the failure
             print(f"Error in idea generation: {e}")
-            return []
+            self.fallbacks.append('idea generation')
+
+        return ideas
+
+    def _record_chunks(self, chunks, cache_key):
+        """
+        Pass streamed chunks through, caching the full text once the stream
+        completes as valid JSON
+        """
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+
+        text = ''.join(received)
+        try:
+            orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return
+        llm_cache.put(cache_key, text)
+
+    def _iter_json_array(self, chunks):
+        """
+        Incrementally parse a JSON array from streamed text
+
+        Args:
+            chunks: Iterable of text chunks that together form a JSON array
+
+        Yields:
+            Each array item as soon as its closing bracket has arrived
+
+        Raises:
+            ValueError: If the text ends before the array's closing ']'
+        """
+        buffer = ''
+        pos = None  # Where the next item starts, once the opening '[' is seen
+
+        for chunk in chunks:
+            buffer += chunk
+            if pos is None:
+                start = buffer.find('[')
+                if start == -1:
+                    continue
+                pos = start + 1
+
+            while True:
+                # Skip separators between items
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buffer) or buffer[pos] == ']':
+                    break
+                try:
+                    item, end = _JSON_DECODER.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Item is not complete yet
+                yield item
+                # Drop consumed text so the buffer stays small
+                buffer = buffer[end:]
+                pos = 0
+
+        # A stream cut short (safety stop, token limit, dropped connection)
+        # must not pass as a complete list of ideas
+        if pos is None or pos >= len(buffer) or buffer[pos] != ']':
+            raise ValueError("response ended before the closing ']' of the ideas array")
@@ -4,21 +4,165 @@ Searches literature, assesses novelty/doability, and ranks research ideas
 """
 
 import os
-import json
+import re
+import orjson
 import time
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import requests
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
+import numpy as np
 import google.generativeai as genai
 
+from agents._clients import get_model
+from utils import llm_cache
+from utils.http import SESSION
+from utils.rate_limit import TokenBucket
+from utils.text import STOPWORDS, keywords
+
+# Upper bound on ideas processed at once (each holds an arXiv + Gemini round-trip)
+MAX_CONCURRENT_IDEAS = 8
+
+# Only the best max(MIN_IDEAS_TO_ASSESS, half) ideas by topic match get the
+# arXiv search and LLM assessment; the rest are dropped before any API call
+MIN_IDEAS_TO_ASSESS = 5
+
+# Embedding model used to match ideas against the user's topics and each other
+EMBEDDING_MODEL = 'models/text-embedding-004'
+
+# Ideas with cosine similarity at or above this are too alike to both make the top 3
+DIVERSITY_THRESHOLD = 0.8
+
+# Clark-notation tags of the arXiv Atom feed, compared directly against
+# element tags instead of resolving 'atom:' prefixes on every lookup
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+TAG_ENTRY = ATOM_NS + 'entry'
+TAG_TITLE = ATOM_NS + 'title'
+TAG_SUMMARY = ATOM_NS + 'summary'
+TAG_PUBLISHED = ATOM_NS + 'published'
+TAG_ID = ATOM_NS + 'id'
+TAG_AUTHOR = ATOM_NS + 'author'
+TAG_NAME = ATOM_NS + 'name'
+
+# arXiv search results are cached by normalized query, in memory and on disk,
+# so repeated or near-duplicate searches skip the network and rate limit
+ARXIV_CACHE_DIR = os.getenv('ARXIV_CACHE_DIR', '.arxiv_cache')
+ARXIV_CACHE_TTL = 24 * 60 * 60  # seconds
+ARXIV_CACHE_MAX_ENTRIES = 1024
+
+_arxiv_cache = OrderedDict()
+_arxiv_cache_lock = threading.Lock()
+
+# Cache key -> [lock, number of holders and waiters], so only one thread
+# fetches a given query while the others wait for its cached result
+_arxiv_inflight = {}
+
+# arXiv asks for one request every 3 seconds; shared by all SearcherAgents
+_arxiv_bucket = TokenBucket(rate=1 / 3.0, capacity=1)
+
+@contextmanager
+def _single_flight(cache_key):
+    """Hold the per-query lock for cache_key, dropping it once unused"""
+    with _arxiv_cache_lock:
+        entry = _arxiv_inflight.setdefault(cache_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _arxiv_cache_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _arxiv_inflight[cache_key]
+
+
+# Static instructions come first in every prompt and the idea-specific
+# content last, so the shared prefix can be reused by provider-side caching
+ASSESSMENT_PREFIX = """Assess the novelty and the feasibility of the research idea given after these instructions, based on the related papers found in existing literature.
+
+Assess novelty:
+1. Has this specific idea been extensively explored? (Yes/Partially/No)
+2. Research maturity level: Unexplored / Emerging / Active / Saturated
+3. What specific gap or unexplored angle does this idea address?
+4. Novelty score: Rate 1-5 (1=extensively explored, 5=highly novel)
+
+Assess doability, considering the related papers when assessing methodology and resources:
+1. Data availability: Are datasets available or need to be collected? (Available/Partially/Need to Collect)
+2. Methodology complexity: Can standard methods be used? (Standard/Moderate/Novel Methods Needed)
+3. Estimated timeline: (3 months / 6 months / 1 year+)
+4. Required expertise: (Undergraduate / Masters / PhD level)
+5. Doability score: Rate 1-5 (1=very difficult, 5=highly doable)
+   - Consider: data availability, methodology complexity, timeline, and expertise needed
+   - Give VARIED scores (not all 3) - differentiate based on the specific challenges of THIS idea
+
+Return ONLY valid JSON:
+{
+  "novelty": {
+    "explored": "Yes/Partially/No",
+    "maturity": "Unexplored/Emerging/Active/Saturated",
+    "gap": "description of gap",
+    "novelty_score": 1-5
+  },
+  "doability": {
+    "data_availability": "Available/Partially/Need to Collect",
+    "methodology": "Standard/Moderate/Novel Methods Needed",
+    "timeline": "3 months/6 months/1 year+",
+    "expertise_level": "Undergraduate/Masters/PhD level",
+    "doability_score": 1-5
+  }
+}"""
+
+SYNTHESIS_PREFIX = """Synthesize the literature for each of the research ideas given after these instructions.
+
+For each idea, create a synthesis that includes:
+1. A brief overview of what has been done (2-3 sentences)
+2. Key papers categorized as: Foundational Work, Recent Advances, or Identifies Gaps
+3. What's missing or unexplored
+4. Suggested approach (methodology, potential datasets, concrete next steps)
+
+Each paper is listed once, numbered, before the ideas; each idea lists the numbers of its related papers, and paper_index refers to those numbers.
+
+Return ONLY valid JSON as an array with one entry per idea:
+[
+  {
+    "idea_index": 1,
+    "overview": "What has been done...",
+    "key_papers": [
+      {"paper_index": 1, "category": "Foundational/Recent/Gap", "summary": "2 sentence summary"},
+      ...
+    ],
+    "whats_missing": "The specific gap...",
+    "suggested_approach": "Concrete next steps..."
+  },
+  ...
+]"""
+
 
 class SearcherAgent:
     def __init__(self):
         """Initialize Searcher Agent"""
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+        # All searcher prompts return JSON. The per-idea assessments output a
+        # few short fields, so they use Flash; Pro is kept for the synthesis,
+        # which reasons over many abstracts at once
+        self.model_flash = get_model('gemini-2.5-flash')
+        self.model_pro = get_model('gemini-2.5-pro')
         self.arxiv_api = "http://export.arxiv.org/api/query"
-
+        # Papers seen during the current research_ideas run, by arXiv ID, so
+        # ideas sharing a paper share one copy of it
+        self._paper_cache = {}
+        # Steps of the current research_ideas call that fell back to defaults
+        self.fallbacks = []
+
+    @llm_cache.cached_method(
+        'searcher.research_ideas',
+        cache_if=lambda result: result['top_ideas'],
+        models=('model_flash', 'model_pro'),
+        depends_on=(ASSESSMENT_PREFIX, SYNTHESIS_PREFIX, EMBEDDING_MODEL)
+    )
     def research_ideas(self, ideas, user_topics):
         """
         Research each idea, assess novelty/doability, rank and return top 3
@@ -30,60 +174,110 @@ class SearcherAgent:
         Returns:
             Dictionary with top 3 ranked ideas with full details
         """
-        scored_ideas = []
-
-        # Process each idea
-        for i, idea in enumerate(ideas):
-            print(f"Processing idea {i+1}/{len(ideas)}: {idea['title']}")
-
-            # Search for related papers
-            papers = self._search_papers(idea)
+        if not ideas:
+            return {
+                'top_ideas': [],
+                'total_ideas_analyzed': 0
+            }
 
-            # Assess novelty
-            novelty_assessment = self._assess_novelty(idea, papers)
+        self._paper_cache = {}
+
+        # Embed ideas and topics in one call, for topic match and diversity
+        idea_texts = [f"{idea.get('title', '')} {idea.get('description', '')}" for idea in ideas]
+        embeddings = None
+        if user_topics or len(ideas) > 3:
+            embeddings = self._embed_texts(idea_texts + list(user_topics or []))
+        idea_embeddings = embeddings[:len(ideas)] if embeddings is not None else None
+
+        # Score topic match for all ideas at once
+        topic_match_scores = self._topic_match_scores(ideas, user_topics, embeddings)
+
+        # Cull ideas with the weakest topic match before the expensive calls.
+        # Topic match is 30% of the composite score, so a bottom-half idea
+        # rarely makes the top 3; the culled ideas are simply not ranked.
+        keep = max(MIN_IDEAS_TO_ASSESS, len(ideas) // 2)
+        if len(ideas) > keep:
+            kept = sorted(range(len(ideas)), key=lambda i: topic_match_scores[i], reverse=True)[:keep]
+            kept.sort()
+            print(f"Assessing {keep} of {len(ideas)} ideas with the best topic match")
+            candidates = [ideas[i] for i in kept]
+            topic_match_scores = [topic_match_scores[i] for i in kept]
+            if idea_embeddings is not None:
+                idea_embeddings = idea_embeddings[kept]
+        else:
+            candidates = ideas
+
+        # Every step is I/O bound on remote APIs, so process ideas concurrently.
+        # An idea that fails is dropped rather than failing the whole batch.
+        workers = min(len(candidates), MAX_CONCURRENT_IDEAS)
+        scored_ideas = []
+        succeeded = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._process_idea, i, idea, len(candidates), topic_match_scores[i])
+                for i, idea in enumerate(candidates)
+            ]
+            for i, future in enumerate(futures):
+                try:
+                    scored_ideas.append(future.result())
+                    succeeded.append(i)
+                except Exception as e:
+                    print(f"Error researching idea '{candidates[i].get('title', '')[:50]}': {e}")
+                    self.fallbacks.append('idea research')
+
+        if not scored_ideas:
+            raise RuntimeError('Failed to research any of the selected ideas')
+        if idea_embeddings is not None:
+            idea_embeddings = idea_embeddings[succeeded]
+
+        # Sort by composite score, keeping embeddings aligned
+        order = sorted(range(len(scored_ideas)), key=lambda i: scored_ideas[i]['composite_score'], reverse=True)
+        scored_ideas = [scored_ideas[i] for i in order]
+        if idea_embeddings is not None:
+            idea_embeddings = idea_embeddings[order]
 
-            # Assess doability
-            doability_assessment = self._assess_doability(idea, papers)
+        # Select top 3 with diversity check
+        top_ideas = self._select_diverse_top_3(scored_ideas, idea_embeddings)
 
-            # Calculate topic match score
-            topic_match_score = self._calculate_topic_match(idea, user_topics)
+        # Synthesize literature for top 3 in a single call
+        syntheses = self._synthesize_literature_batch(top_ideas)
+        for item, synthesis in zip(top_ideas, syntheses):
+            item['literature_synthesis'] = synthesis
 
-            # Calculate composite score: 30% novelty + 40% doability + 30% topic match
-            composite_score = (
-                0.3 * novelty_assessment['novelty_score'] +
-                0.4 * doability_assessment['doability_score'] +
-                0.3 * topic_match_score
-            )
+        return {
+            'top_ideas': top_ideas,
+            'total_ideas_analyzed': len(ideas)
+        }
 
-            scored_ideas.append({
-                'idea': idea,
-                'papers': papers[:8],  # Keep top 8 papers
-                'novelty_assessment': novelty_assessment,
-                'doability_assessment': doability_assessment,
-                'topic_match_score': topic_match_score,
-                'composite_score': composite_score
-            })
+    def _process_idea(self, index, idea, total, topic_match_score):
+        """
+        Search, assess and score a single idea
 
-            # Rate limiting (Semantic Scholar: 100 req / 5 min)
-            # Wait longer between ideas to avoid hitting rate limits
-            time.sleep(3)
+        Returns:
+            Scored idea dictionary
+        """
+        print(f"Processing idea {index+1}/{total}: {idea['title']}")
 
-        # Sort by composite score
-        scored_ideas.sort(key=lambda x: x['composite_score'], reverse=True)
+        # Search for related papers
+        papers = self._search_papers(idea)
 
-        # Select top 3 with diversity check
-        top_ideas = self._select_diverse_top_3(scored_ideas)
+        # Assess novelty and doability in one call
+        novelty_assessment, doability_assessment = self._assess_combined(idea, papers)
 
-        # Synthesize literature for top 3
-        for item in top_ideas:
-            item['literature_synthesis'] = self._synthesize_literature(
-                item['idea'],
-                item['papers']
-            )
+        # Calculate composite score: 30% novelty + 40% doability + 30% topic match
+        composite_score = (
+            0.3 * novelty_assessment['novelty_score'] +
+            0.4 * doability_assessment['doability_score'] +
+            0.3 * topic_match_score
+        )
 
         return {
-            'top_ideas': top_ideas,
-            'total_ideas_analyzed': len(ideas)
+            'idea': idea,
+            'papers': papers[:8],  # Keep top 8 papers
+            'novelty_assessment': novelty_assessment,
+            'doability_assessment': doability_assessment,
+            'topic_match_score': topic_match_score,
+            'composite_score': composite_score
         }
 
     def _search_papers(self, idea, limit=20, max_retries=3):
@@ -96,276 +290,388 @@ class SearcherAgent:
         # Construct search query from idea title and description
         search_terms = f"{idea['title']} {idea.get('description', '')[:100]}"
 
+        cache_key = self._arxiv_cache_key(search_terms, limit)
+        cached_papers = self._get_cached_papers(cache_key)
+        if cached_papers is not None:
+            print(f"Using cached arXiv results for: {idea['title'][:50]}")
+            return self._dedupe_papers(cached_papers)
+
         # Clean and prepare query for arXiv
         query = quote(search_terms)
 
-        for attempt in range(max_retries):
-            try:
-                # Query arXiv API
-                url = f"{self.arxiv_api}?search_query=all:{query}&start=0&max_results={limit}&sortBy=relevance&sortOrder=descending"
-
-                print(f"Searching arXiv for: {idea['title'][:50]}...")
-                response = requests.get(url, timeout=15)
-                response.raise_for_status()
-
-                # Parse XML response
-                root = ET.fromstring(response.content)
-
-                # Define namespaces
-                namespaces = {
-                    'atom': 'http://www.w3.org/2005/Atom',
-                    'arxiv': 'http://arxiv.org/schemas/atom'
-                }
-
-                # Extract papers
-                formatted_papers = []
-                entries = root.findall('atom:entry', namespaces)
-
-                for entry in entries:
-                    # Extract basic info
-                    title = entry.find('atom:title', namespaces)
-                    summary = entry.find('atom:summary', namespaces)
-                    published = entry.find('atom:published', namespaces)
-                    link = entry.find('atom:id', namespaces)
-
-                    # Extract authors
-                    authors = []
-                    for author in entry.findall('atom:author', namespaces)[:3]:
-                        name = author.find('atom:name', namespaces)
-                        if name is not None:
-                            authors.append(name.text)
-
-                    # Only include if we have title and abstract
-                    if title is not None and summary is not None:
-                        # Extract year from published date (format: YYYY-MM-DD)
-                        year = None
-                        if published is not None:
-                            try:
-                                year = int(published.text[:4])
-                            except:
-                                year = None
-
-                        formatted_papers.append({
-                            'title': title.text.strip().replace('\n', ' '),
-                            'abstract': summary.text.strip().replace('\n', ' ')[:500],  # Limit abstract length
-                            'year': year,
-                            'citations': 0,  # arXiv doesn't provide citation counts
-                            'authors': authors,
-                            'url': link.text if link is not None else ''
-                        })
-
-                print(f"Successfully fetched {len(formatted_papers)} papers from arXiv for: {idea['title'][:50]}")
-
-                # arXiv requests a 3 second delay between requests
-                time.sleep(3)
-
-                return formatted_papers
-
-            except requests.exceptions.RequestException as e:
-                print(f"Error fetching from arXiv (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    wait_time = 3
-                    print(f"Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"Failed to fetch papers after {max_retries} attempts")
+        # Concurrent ideas searching the same query share one request
+        with _single_flight(cache_key):
+            # Another idea may have fetched the same query while we waited
+            cached_papers = self._get_cached_papers(cache_key)
+            if cached_papers is not None:
+                return self._dedupe_papers(cached_papers)
+
+            for attempt in range(max_retries):
+                try:
+                    # Query arXiv API
+                    url = f"{self.arxiv_api}?search_query=all:{query}&start=0&max_results={limit}&sortBy=relevance&sortOrder=descending"
+
+                    # Wait for our turn only right before the request, so parsing
+                    # and scoring of other ideas overlaps with the rate-limit wait
+                    _arxiv_bucket.acquire()
+
+                    print(f"Searching arXiv for: {idea['title'][:50]}...")
+                    with SESSION.get(url, timeout=15, stream=True) as response:
+                        response.raise_for_status()
+
+                        # Parse entries as chunks arrive, freeing each once extracted
+                        formatted_papers = self._read_arxiv_feed(response, limit)
+
+                    print(f"Successfully fetched {len(formatted_papers)} papers from arXiv for: {idea['title'][:50]}")
+                    self._store_cached_papers(cache_key, formatted_papers)
+
+                    return self._dedupe_papers(formatted_papers)
+
+                except requests.exceptions.RequestException as e:
+                    print(f"Error fetching from arXiv (attempt {attempt + 1}/{max_retries}): {e}")
+                    if attempt < max_retries - 1:
+                        print("Retrying...")
+                        continue
+                    else:
+                        print(f"Failed to fetch papers after {max_retries} attempts")
+                        self.fallbacks.append('arXiv search')
+                        return []
+                except Exception as e:
+                    print(f"Error parsing arXiv response: {e}")
+                    self.fallbacks.append('arXiv search')
                     return []
-            except Exception as e:
-                print(f"Error parsing arXiv response: {e}")
-                return []
 
-        return []
+            return []
+
+    def _dedupe_papers(self, papers):
+        """
+        Replace papers already seen in this run with the stored copy
+
+        Returns:
+            List of paper dictionaries shared with other ideas where they overlap
+        """
+        return [self._paper_cache.setdefault(self._paper_key(p), p) for p in papers]
+
+    def _paper_key(self, paper):
+        """Identify a paper by arXiv ID, falling back to its URL or title"""
+        return paper.get('arxiv_id') or paper.get('url') or paper['title']
+
+    def _arxiv_cache_key(self, search_terms, limit):
+        """
+        Build a cache key from the search terms, ignoring case, word order,
+        repeated words and stopwords
+        """
+        tokens = set(re.findall(r"\w+", search_terms.lower())) - STOPWORDS
+        return f"{limit}:{' '.join(sorted(tokens))}"
+
+    def _arxiv_cache_path(self, cache_key):
+        """Path of the on-disk cache file for a cache key"""
+        return os.path.join(ARXIV_CACHE_DIR, hashlib.sha256(cache_key.encode()).hexdigest() + '.json')
+
+    def _get_cached_papers(self, cache_key):
+        """
+        Look up cached arXiv results, first in memory and then on disk
+
+        Returns:
+            List of paper dictionaries, or None on a cache miss
+        """
+        with _arxiv_cache_lock:
+            if cache_key in _arxiv_cache:
+                _arxiv_cache.move_to_end(cache_key)
+                return list(_arxiv_cache[cache_key])
+
+        path = self._arxiv_cache_path(cache_key)
+        try:
+            if time.time() - os.path.getmtime(path) > ARXIV_CACHE_TTL:
+                return None
+            with open(path, 'rb') as f:
+                papers = orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        self._remember_papers(cache_key, papers)
+        return list(papers)
+
+    def _store_cached_papers(self, cache_key, papers):
+        """Save arXiv results to the memory and disk caches"""
+        if not papers:
+            return
+
+        self._remember_papers(cache_key, papers)
+
+        path = self._arxiv_cache_path(cache_key)
+        try:
+            os.makedirs(ARXIV_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(papers))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write arXiv cache: {e}")
+
+    def _remember_papers(self, cache_key, papers):
+        """Add results to the in-memory cache, evicting the least recently used"""
+        with _arxiv_cache_lock:
+            _arxiv_cache[cache_key] = papers
+            _arxiv_cache.move_to_end(cache_key)
+            while len(_arxiv_cache) > ARXIV_CACHE_MAX_ENTRIES:
+                _arxiv_cache.popitem(last=False)
+
+    def _read_arxiv_feed(self, response, limit):
+        """
+        Incrementally parse a streamed arXiv Atom response
+
+        Returns:
+            List of up to `limit` paper dictionaries
+        """
+        papers = []
+        parser = ET.XMLPullParser(events=('end',))
+
+        for chunk in response.iter_content(chunk_size=8192):
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if element.tag != TAG_ENTRY:
+                    continue
+                paper = self._parse_arxiv_entry(element)
+                if paper:
+                    papers.append(paper)
+                element.clear()
+                if len(papers) >= limit:
+                    # Enough entries; stop reading the rest of the download
+                    return papers
+
+        parser.close()
+        return papers
+
+    def _parse_arxiv_entry(self, entry):
+        """
+        Extract paper fields from an arXiv Atom <entry> element
+
+        Returns:
+            Paper dictionary, or None if the entry has no title or abstract
+        """
+        title = summary = published = link = None
+        authors = []
+
+        for child in entry:
+            tag = child.tag
+            if tag == TAG_TITLE:
+                title = child.text
+            elif tag == TAG_SUMMARY:
+                summary = child.text
+            elif tag == TAG_PUBLISHED:
+                published = child.text
+            elif tag == TAG_ID:
+                link = child.text
+            elif tag == TAG_AUTHOR and len(authors) < 3:
+                for grandchild in child:
+                    if grandchild.tag == TAG_NAME:
+                        authors.append(grandchild.text)
+                        break
+
+        # Only include if we have title and abstract
+        if title is None or summary is None:
+            return None
+
+        # Extract year from published date (format: YYYY-MM-DD)
+        year = None
+        if published is not None:
+            try:
+                year = int(published[:4])
+            except:
+                year = None
+
+        # arXiv ID without version, e.g. http://arxiv.org/abs/2101.00001v2 -> 2101.00001
+        arxiv_id = ''
+        if link and '/abs/' in link:
+            arxiv_id = re.sub(r'v\d+$', '', link.rsplit('/abs/', 1)[1])
+
+        return {
+            'arxiv_id': arxiv_id,
+            'title': title.strip().replace('\n', ' '),
+            'abstract': summary.strip().replace('\n', ' ')[:500],  # Limit abstract length
+            'year': year,
+            'citations': 0,  # arXiv doesn't provide citation counts
+            'authors': authors,
+            'url': link or ''
+        }
 
-    def _assess_novelty(self, idea, papers):
+    def _assess_combined(self, idea, papers):
         """
-        Use Claude to assess novelty of research idea
+        Use Gemini to assess novelty and doability of research idea in one call
 
         Returns:
-            Dictionary with novelty assessment
+            Tuple of (novelty assessment, doability assessment) dictionaries
         """
         papers_summary = "\n\n".join([
             f"Title: {p['title']}\nYear: {p['year']}\nAbstract: {p['abstract'][:300]}..."
             for p in papers[:10]
         ])
 
-        prompt = f"""Assess the novelty of this research idea based on existing literature.
+        prompt = f"""{ASSESSMENT_PREFIX}
 
 Research Idea:
 Title: {idea['title']}
 Description: {idea['description']}
 
 Related Papers Found:
-{papers_summary}
+{papers_summary}"""
 
-Assess:
-1. Has this specific idea been extensively explored? (Yes/Partially/No)
-2. Research maturity level: Unexplored / Emerging / Active / Saturated
-3. What specific gap or unexplored angle does this idea address?
-4. Novelty score: Rate 1-5 (1=extensively explored, 5=highly novel)
-
-Return ONLY valid JSON:
-{{
-  "explored": "Yes/Partially/No",
-  "maturity": "Unexplored/Emerging/Active/Saturated",
-  "gap": "description of gap",
-  "novelty_score": 1-5
-}}"""
+        novelty_assessment = {
+            'explored': 'Unknown',
+            'maturity': 'Unknown',
+            'gap': 'Unable to assess',
+            'novelty_score': 3
+        }
+        doability_assessment = {
+            'data_availability': 'Unknown',
+            'methodology': 'Unknown',
+            'timeline': 'Unknown',
+            'expertise_level': 'Unknown',
+            'doability_score': 3
+        }
 
         try:
-            response = self.model.generate_content(prompt)
-
-            content = response.text
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                content = content[json_start:json_end]
-
-            assessment = json.loads(content)
-            return assessment
+            assessment = llm_cache.cached_generate(self.model_flash, prompt, parse=orjson.loads)
+            if not assessment.get('novelty') or not assessment.get('doability'):
+                self.fallbacks.append('assessment')
+            novelty_assessment = assessment.get('novelty') or novelty_assessment
+            doability_assessment = assessment.get('doability') or doability_assessment
+            print(f"Doability assessment for '{idea['title']}': {doability_assessment.get('doability_score', 'N/A')}")
 
         except Exception as e:
-            print(f"Error assessing novelty: {e}")
-            return {
-                'explored': 'Unknown',
-                'maturity': 'Unknown',
-                'gap': 'Unable to assess',
-                'novelty_score': 3
-            }
+            print(f"Error assessing idea: {e}")
+            self.fallbacks.append('assessment')
 
-    def _assess_doability(self, idea, papers):
+        return novelty_assessment, doability_assessment
+
+    def _topic_match_scores(self, ideas, user_topics, embeddings):
         """
-        Use Gemini to assess doability/feasibility of research idea
+        Calculate topic match scores for all ideas
+        Each idea scores by cosine similarity to its closest user topic
+
+        Args:
+            ideas: List of idea dictionaries
+            user_topics: List of user-selected topics
+            embeddings: Normalized embeddings of the ideas followed by the
+                topics, or None to fall back to keyword matching
 
         Returns:
-            Dictionary with doability assessment
+            List of scores from 1.5-5, in the same order as ideas
         """
-        # Include paper info if available
-        papers_context = ""
-        if papers and len(papers) > 0:
-            papers_context = f"\n\nRelated Research Papers:\n"
-            for i, paper in enumerate(papers[:3]):
-                papers_context += f"{i+1}. {paper['title']} ({paper['year']})\n"
-            papers_context += "\nConsider these papers when assessing methodology and resources."
+        if not user_topics:
+            return [3] * len(ideas)  # Neutral score if no topics
 
-        prompt = f"""Assess the feasibility and doability of this research idea.
+        if embeddings is None:
+            # Fall back to keyword matching, tokenizing each topic once
+            topic_keywords = [keywords(topic) for topic in user_topics]
+            return [self._calculate_topic_match(idea, topic_keywords) for idea in ideas]
 
-Research Idea:
-Title: {idea['title']}
-Description: {idea['description']}{papers_context}
+        idea_embeddings = embeddings[:len(ideas)]
+        topic_embeddings = embeddings[len(ideas):]
 
-Based on the idea and typical research resources, assess:
-1. Data availability: Are datasets available or need to be collected? (Available/Partially/Need to Collect)
-2. Methodology complexity: Can standard methods be used? (Standard/Moderate/Novel Methods Needed)
-3. Estimated timeline: (3 months / 6 months / 1 year+)
-4. Required expertise: (Undergraduate / Masters / PhD level)
-5. Doability score: Rate 1-5 (1=very difficult, 5=highly doable)
-   - Consider: data availability, methodology complexity, timeline, and expertise needed
-   - Give VARIED scores (not all 3) - differentiate based on the specific challenges of THIS idea
+        # N x T cosine similarities (embeddings are L2-normalized)
+        similarity = idea_embeddings @ topic_embeddings.T
+        scores = 1.5 + 3.5 * np.clip(similarity.max(axis=1), 0, 1)
 
-Return ONLY valid JSON:
-{{
-  "data_availability": "Available/Partially/Need to Collect",
-  "methodology": "Standard/Moderate/Novel Methods Needed",
-  "timeline": "3 months/6 months/1 year+",
-  "expertise_level": "Undergraduate/Masters/PhD level",
-  "doability_score": 1-5
-}}"""
+        for idea, score in zip(ideas, scores):
+            print(f"Topic match for '{idea.get('title', 'N/A')}': score={score:.1f}")
 
-        try:
-            response = self.model.generate_content(prompt)
+        return [round(float(score), 1) for score in scores]
 
-            content = response.text
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                content = content[json_start:json_end]
+    def _embed_texts(self, texts):
+        """
+        Embed texts with Gemini in a single batched call
 
-            assessment = json.loads(content)
-            print(f"Doability assessment for '{idea['title']}': {assessment.get('doability_score', 'N/A')}")
-            return assessment
+        Returns:
+            L2-normalized array of shape (len(texts), dim), or None on failure
+        """
+        try:
+            result = genai.embed_content(
+                model=EMBEDDING_MODEL,
+                content=texts,
+                task_type='semantic_similarity'
+            )
+            embeddings = np.asarray(result['embedding'], dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            return embeddings / np.maximum(norms, 1e-12)
 
         except Exception as e:
-            print(f"Error assessing doability: {e}")
-            return {
-                'data_availability': 'Unknown',
-                'methodology': 'Unknown',
-                'timeline': 'Unknown',
-                'expertise_level': 'Unknown',
-                'doability_score': 3
-            }
+            print(f"Error embedding texts: {e}")
+            self.fallbacks.append('embeddings')
+            return None
 
-    def _calculate_topic_match(self, idea, user_topics):
+    def _calculate_topic_match(self, idea, topic_keywords):
         """
         Calculate how well idea matches user's selected topics
-        Uses semantic matching of idea content with user topics
+        Uses keyword matching of idea content with user topics; this is the
+        fallback when embeddings are unavailable
+
+        Args:
+            idea: Idea dictionary
+            topic_keywords: List of keyword sets, one per user topic
 
         Returns:
             Score from 0-5
         """
-        if not user_topics:
+        if not topic_keywords:
             return 3  # Neutral score if no topics
 
         # Combine idea title and description for matching
-        idea_text = f"{idea.get('title', '')} {idea.get('description', '')}".lower()
-        user_topics_lower = [topic.lower() for topic in user_topics]
-
-        # Count how many user topics appear in the idea text
-        matches = 0
-        for topic in user_topics_lower:
-            # Split topic into keywords for better matching
-            topic_words = topic.split()
-            # Check if any word from the topic appears in the idea
-            if any(word in idea_text for word in topic_words if len(word) > 3):
-                matches += 1
+        idea_keywords = keywords(f"{idea.get('title', '')} {idea.get('description', '')}")
 
-        # Score based on match ratio (0 to 5 scale)
-        if not user_topics_lower:
-            return 2.5
+        # Count how many user topics share a keyword with the idea
+        matches = sum(1 for topic in topic_keywords if topic & idea_keywords)
 
-        match_ratio = matches / len(user_topics_lower)
+        match_ratio = matches / len(topic_keywords)
 
         # Convert to 1-5 scale with variation
         # 0 matches = 1.5, all matches = 5.0
         score = 1.5 + (match_ratio * 3.5)
 
-        print(f"Topic match for '{idea.get('title', 'N/A')}': {matches}/{len(user_topics_lower)} topics matched, score={score:.1f}")
+        print(f"Topic match for '{idea.get('title', 'N/A')}': {matches}/{len(topic_keywords)} topics matched, score={score:.1f}")
 
         return round(score, 1)
 
-    def _select_diverse_top_3(self, scored_ideas):
+    def _select_diverse_top_3(self, scored_ideas, idea_embeddings=None):
         """
         Select top 3 ideas ensuring diversity (not all similar)
 
+        Args:
+            scored_ideas: Scored idea dictionaries sorted by composite score
+            idea_embeddings: Normalized idea embeddings in the same order, or
+                None to compare titles instead
+
         Returns:
             List of top 3 idea dictionaries
         """
         if len(scored_ideas) <= 3:
             return scored_ideas
 
-        # Simple diversity check: take top idea, then find next ideas with different keywords
-        top_3 = [scored_ideas[0]]
-
-        for item in scored_ideas[1:]:
-            if len(top_3) >= 3:
-                break
-
-            # Check if idea is different enough from already selected
-            is_diverse = True
-            current_title = item['idea']['title'].lower()
-
-            for selected in top_3:
-                selected_title = selected['idea']['title'].lower()
-                # Simple diversity check: ensure titles don't share too many words
-                current_words = set(current_title.split())
-                selected_words = set(selected_title.split())
-                common_words = current_words & selected_words
-                if len(common_words) > 3:  # More than 3 common words
-                    is_diverse = False
+        if idea_embeddings is not None:
+            # Greedy: take the best idea, then repeatedly the best-scoring idea
+            # that is not too similar to any already picked
+            picked = [0]
+            while len(picked) < 3:
+                similarity = idea_embeddings @ idea_embeddings[picked].T
+                candidates = np.flatnonzero(similarity.max(axis=1) < DIVERSITY_THRESHOLD)
+                if len(candidates) == 0:
+                    break
+                picked.append(int(candidates[0]))  # Sorted, so first is highest score
+            top_3 = [scored_ideas[i] for i in picked]
+        else:
+            # Simple diversity check: take top idea, then find next ideas with different keywords
+            top_3 = [scored_ideas[0]]
+
+            for item in scored_ideas[1:]:
+                if len(top_3) >= 3:
                     break
 
-            if is_diverse:
-                top_3.append(item)
+                # Ensure titles don't share too many words with already selected ideas
+                current_words = set(item['idea']['title'].lower().split())
+                if all(len(current_words & set(selected['idea']['title'].lower().split())) <= 3
+                       for selected in top_3):
+                    top_3.append(item)
 
         # If we didn't get 3 diverse ideas, just take top 3 by score
         if len(top_3) < 3:
@@ -373,59 +679,75 @@ Return ONLY valid JSON:
 
         return top_3
 
-    def _synthesize_literature(self, idea, papers):
+    def _synthesize_literature_batch(self, top_ideas):
         """
-        Synthesize literature for an idea
+        Synthesize literature for several ideas in a single call
+
+        Args:
+            top_ideas: List of scored idea dictionaries (with 'idea' and 'papers')
 
         Returns:
-            Dictionary with synthesized literature information
+            List of synthesis dictionaries, in the same order as top_ideas
         """
+        # Number each distinct paper once, so papers shared between ideas are
+        # only sent once
+        catalog = []
+        catalog_numbers = {}
+        idea_paper_numbers = []
+        for item in top_ideas:
+            numbers = []
+            for paper in item['papers'][:8]:
+                key = self._paper_key(paper)
+                if key not in catalog_numbers:
+                    catalog.append(paper)
+                    catalog_numbers[key] = len(catalog)
+                numbers.append(catalog_numbers[key])
+            idea_paper_numbers.append(numbers)
+
         papers_text = "\n\n".join([
             f"[{i+1}] {p['title']} ({p['year']})\n{p['abstract'][:200]}..."
-            for i, p in enumerate(papers[:8])
+            for i, p in enumerate(catalog)
+        ])
+        ideas_text = "\n\n".join([
+            f"Idea {i+1}: {item['idea']['title']}\nRelated Papers: {', '.join(f'[{n}]' for n in numbers)}"
+            for i, (item, numbers) in enumerate(zip(top_ideas, idea_paper_numbers))
         ])
 
-        prompt = f"""Synthesize the literature for this research idea.
-
-Research Idea: {idea['title']}
+        prompt = f"""{SYNTHESIS_PREFIX}
 
-Related Papers:
+Papers:
 {papers_text}
 
-Create a synthesis that includes:
-1. A brief overview of what has been done (2-3 sentences)
-2. Key papers categorized as: Foundational Work, Recent Advances, or Identifies Gaps
-3. What's missing or unexplored
-4. Suggested approach (methodology, potential datasets, concrete next steps)
+Ideas:
+{ideas_text}"""
 
-Return ONLY valid JSON:
-{{
-  "overview": "What has been done...",
-  "key_papers": [
-    {{"paper_index": 1, "category": "Foundational/Recent/Gap", "summary": "2 sentence summary"}},
-    ...
-  ],
-  "whats_missing": "The specific gap...",
-  "suggested_approach": "Concrete next steps..."
-}}"""
-
-        try:
-            response = self.model.generate_content(prompt)
+        syntheses = [{
+            'overview': 'Unable to synthesize',
+            'key_papers': [],
+            'whats_missing': 'Unable to assess',
+            'suggested_approach': 'Unable to provide'
+        } for _ in top_ideas]
 
-            content = response.text
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                content = content[json_start:json_end]
+        if not top_ideas:
+            return syntheses
 
-            synthesis = json.loads(content)
-            return synthesis
+        synthesized = set()
+        try:
+            for synthesis in llm_cache.cached_generate(self.model_pro, prompt, parse=orjson.loads):
+                index = synthesis.pop('idea_index', None)
+                if isinstance(index, int) and 1 <= index <= len(syntheses):
+                    synthesized.add(index)
+                    # Map paper numbers back to positions in the idea's own papers
+                    numbers = idea_paper_numbers[index - 1]
+                    for key_paper in synthesis.get('key_papers', []):
+                        if key_paper.get('paper_index') in numbers:
+                            key_paper['paper_index'] = numbers.index(key_paper['paper_index']) + 1
+                    syntheses[index - 1] = synthesis
 
         except Exception as e:
             print(f"Error synthesizing literature: {e}")
-            return {
-                'overview': 'Unable to synthesize',
-                'key_papers': [],
-                'whats_missing': 'Unable to assess',
-                'suggested_approach': 'Unable to provide'
-            }
+
+        if len(synthesized) < len(syntheses):
+            self.fallbacks.append('literature synthesis')
+
+        return syntheses
@@ -0,0 +1,31 @@
+"""Add foreign key indexes
+
+Revision ID: b7d41c2e9a10
+Revises: 
+Create Date: 2026-10-15 22:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c2e9a10'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables created by init_db() after this change already have the indexes
+    op.create_index('ix_analyses_paper_id_created_at', 'analyses', ['paper_id', 'created_at'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_research_ideas_analysis_id'), 'research_ideas', ['analysis_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_references_idea_id'), 'references', ['idea_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_references_idea_id'), table_name='references')
+    op.drop_index(op.f('ix_research_ideas_analysis_id'), table_name='research_ideas')
+    op.drop_index('ix_analyses_paper_id_created_at', table_name='analyses')
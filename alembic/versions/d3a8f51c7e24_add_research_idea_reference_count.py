@@ -0,0 +1,34 @@
+"""Add reference_count to research_ideas
+
+Revision ID: d3a8f51c7e24
+Revises: b7d41c2e9a10
+Create Date: 2026-10-15 23:55:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f51c7e24'
+down_revision: Union[str, None] = 'b7d41c2e9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('research_ideas') as batch_op:
+        batch_op.add_column(sa.Column('reference_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill counts for ideas stored before the column existed
+    op.execute(
+        'UPDATE research_ideas SET reference_count = '
+        '(SELECT COUNT(*) FROM "references" WHERE "references".idea_id = research_ideas.id)'
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('research_ideas') as batch_op:
+        batch_op.drop_column('reference_count')
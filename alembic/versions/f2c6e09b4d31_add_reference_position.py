@@ -0,0 +1,38 @@
+"""Add position to references
+
+Revision ID: f2c6e09b4d31
+Revises: d3a8f51c7e24
+Create Date: 2026-10-16 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6e09b4d31'
+down_revision: Union[str, None] = 'd3a8f51c7e24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('references') as batch_op:
+        batch_op.add_column(sa.Column('position', sa.Integer(), nullable=True))
+
+    # Number existing references within each idea by insertion time, the
+    # order they were previously read back in
+    op.execute(
+        'UPDATE "references" SET position = ('
+        'SELECT COUNT(*) FROM "references" AS earlier '
+        'WHERE earlier.idea_id = "references".idea_id '
+        'AND (earlier.created_at < "references".created_at '
+        'OR (earlier.created_at = "references".created_at AND earlier.id < "references".id)))'
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('references') as batch_op:
+        batch_op.drop_column('position')
@@ -4,11 +4,18 @@ Main application file with API endpoints
 """
 
 import os
+import sys
 import json
 import uuid
+import tempfile
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, func
+from sqlalchemy.orm import selectinload, undefer
+from flask import Flask, Request, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import UnsupportedMediaType
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
@@ -17,31 +24,97 @@ from utils.scholar_scraper import scrape_scholar_profile
 from agents.reader import ReaderAgent
 from agents.searcher import SearcherAgent
 from agents.profiler import ProfilerAgent
-from database import get_db, init_db
+from database import db_session, init_db, check_schema
 from models import User, Paper, Analysis, ResearchIdea, Reference
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='.')
-CORS(app)
-
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+PDF_MAGIC = b'%PDF-'  # Every PDF file starts with this header
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PdfUploadFile:
+    """
+    Upload temp file that rejects the upload as soon as its first bytes show
+    it is not a PDF, instead of after the whole body has been received
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._head = b''
+
+    def write(self, data):
+        if self._head is not None:
+            self._head += data
+            if len(self._head) >= len(PDF_MAGIC):
+                if not self._head.startswith(PDF_MAGIC):
+                    raise UnsupportedMediaType('Invalid file type. Only PDF files are allowed')
+                self._head = None
+        return self._file.write(data)
+
+    def is_pdf(self):
+        """Whether the bytes written so far start with the PDF header"""
+        return self._head is None
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """
+    Request that streams uploaded files into a temp file in UPLOAD_FOLDER,
+    so upload_paper can move the file into place instead of copying it
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        stream = tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_FOLDER, suffix='.part', delete=False)
+        if not hasattr(self, 'upload_temp_files'):
+            self.upload_temp_files = []
+        self.upload_temp_files.append(stream.name)
+        return PdfUploadFile(stream)
+
+
+# Initialize Flask app
+app = Flask(__name__, static_folder='.')
+app.request_class = UploadRequest
+CORS(app)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Background workers for the read and search phases, so request handlers
+# return immediately instead of waiting on the LLM pipeline
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Progress of running jobs: job_id -> (status, progress). Intermediate steps
+# only update this; the database is written once, when a job finishes or fails
+JOB_PROGRESS = {}
+JOB_PROGRESS_LOCK = threading.Lock()
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+@app.teardown_request
+def remove_upload_temp_files(exc):
+    """Delete streamed uploads that were not moved into place"""
+    for path in getattr(request, 'upload_temp_files', []):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
@@ -79,77 +152,74 @@ def create_user_profile():
 
     Returns: {"user_id": "uuid", "profile": {...}}
     """
-    db = get_db()
     try:
-        data = request.get_json()
-        method = data.get('method', 'manual')
+        with db_session() as db:
+            data = request.get_json()
+            method = data.get('method', 'manual')
 
-        # Create user record
-        user = User(id=str(uuid.uuid4()))
+            # Create user record
+            user = User(id=str(uuid.uuid4()))
 
-        # Initialize profiler agent
-        profiler = ProfilerAgent()
+            # Initialize profiler agent
+            profiler = ProfilerAgent()
 
-        if method == 'manual':
-            description = data.get('description', '')
-            experience_level = data.get('experience_level')
+            if method == 'manual':
+                description = data.get('description', '')
+                experience_level = data.get('experience_level')
 
-            if not description:
-                return jsonify({'error': 'Description is required for manual method'}), 400
+                if not description:
+                    return jsonify({'error': 'Description is required for manual method'}), 400
 
-            # Store input
-            user.description = description
+                # Store input
+                user.description = description
 
-            # Analyze and create profile
-            profile = profiler.analyze_description(description, experience_level)
-            user.profile = profile
+                # Analyze and create profile
+                profile = profiler.analyze_description(description, experience_level)
+                user.profile = profile
 
-        elif method == 'scholar':
-            scholar_url = data.get('google_scholar_url', '')
+            elif method == 'scholar':
+                scholar_url = data.get('google_scholar_url', '')
 
-            if not scholar_url:
-                return jsonify({'error': 'Google Scholar URL is required for scholar method'}), 400
+                if not scholar_url:
+                    return jsonify({'error': 'Google Scholar URL is required for scholar method'}), 400
 
-            # Store URL
-            user.google_scholar_url = scholar_url
+                # Store URL
+                user.google_scholar_url = scholar_url
 
-            try:
-                # Scrape Google Scholar profile
-                scholar_data = scrape_scholar_profile(scholar_url)
+                try:
+                    # Scrape Google Scholar profile
+                    scholar_data = scrape_scholar_profile(scholar_url)
                 
-                # Store scraped data
-                user.google_scholar_data = scholar_data
+                    # Store scraped data
+                    user.google_scholar_data = scholar_data
                 
-                # Analyze scholar data and create profile
-                profile = profiler.analyze_scholar_data(scholar_data)
-                user.profile = profile
+                    # Analyze scholar data and create profile
+                    profile = profiler.analyze_scholar_data(scholar_data)
+                    user.profile = profile
                 
-            except ValueError as e:
-                # Handle scraping errors
-                return jsonify({'error': f'Failed to import Google Scholar profile: {str(e)}'}), 400
-            except Exception as e:
-                # Handle other errors
-                print(f"Error processing Google Scholar profile: {e}")
-                return jsonify({'error': f'An error occurred while processing Google Scholar profile: {str(e)}'}), 500
+                except ValueError as e:
+                    # Handle scraping errors
+                    return jsonify({'error': f'Failed to import Google Scholar profile: {str(e)}'}), 400
+                except Exception as e:
+                    # Handle other errors
+                    print(f"Error processing Google Scholar profile: {e}")
+                    return jsonify({'error': f'An error occurred while processing Google Scholar profile: {str(e)}'}), 500
 
-        else:
-            return jsonify({'error': 'Invalid method. Use "manual" or "scholar"'}), 400
+            else:
+                return jsonify({'error': 'Invalid method. Use "manual" or "scholar"'}), 400
 
-        # Save to database
-        db.add(user)
-        db.commit()
+            # Save to database
+            db.add(user)
+            db.commit()
 
-        return jsonify({
-            'user_id': user.id,
-            'profile': user.profile,
-            'message': 'Profile created successfully'
-        }), 201
+            return jsonify({
+                'user_id': user.id,
+                'profile': user.profile,
+                'message': 'Profile created successfully'
+            }), 201
 
     except Exception as e:
-        db.rollback()
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/users/<user_id>/profile', methods=['GET'])
@@ -159,8 +229,7 @@ def get_user_profile(user_id):
 
     Returns: {"user_id": "uuid", "profile": {...}}
     """
-    db = get_db()
-    try:
+    with db_session() as db:
         user = db.query(User).filter_by(id=user_id).first()
 
         if not user:
@@ -168,9 +237,6 @@ def get_user_profile(user_id):
 
         return jsonify(user.to_dict()), 200
 
-    finally:
-        db.close()
-
 
 @app.route('/api/users/<user_id>/profile', methods=['PUT'])
 def update_user_profile(user_id):
@@ -185,36 +251,33 @@ def update_user_profile(user_id):
 
     Returns: {"user_id": "uuid", "profile": {...}}
     """
-    db = get_db()
     try:
-        user = db.query(User).filter_by(id=user_id).first()
+        with db_session() as db:
+            user = db.query(User).filter_by(id=user_id).first()
 
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
 
-        data = request.get_json()
+            data = request.get_json()
 
-        # If description is provided, re-analyze
-        if 'description' in data:
-            user.description = data['description']
-            profiler = ProfilerAgent()
-            user.profile = profiler.analyze_description(data['description'])
-            user.updated_at = datetime.utcnow()
+            # If description is provided, re-analyze
+            if 'description' in data:
+                user.description = data['description']
+                profiler = ProfilerAgent()
+                user.profile = profiler.analyze_description(data['description'])
+                user.updated_at = datetime.utcnow()
 
-        # If profile is directly provided, update it
-        elif 'profile' in data:
-            user.profile = data['profile']
-            user.updated_at = datetime.utcnow()
+            # If profile is directly provided, update it
+            elif 'profile' in data:
+                user.profile = data['profile']
+                user.updated_at = datetime.utcnow()
 
-        db.commit()
+            db.commit()
 
-        return jsonify(user.to_dict()), 200
+            return jsonify(user.to_dict()), 200
 
     except Exception as e:
-        db.rollback()
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 
 # ============================================================================
@@ -228,6 +291,13 @@ def upload_paper():
     Expects: file (multipart), user_id (optional form field)
     Returns: job_id for tracking the analysis
     """
+    # Reject from the headers alone before reading the body
+    if request.content_length and request.content_length > MAX_FILE_SIZE:
+        return jsonify({'error': 'File too large. Maximum size is 50MB'}), 413
+
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({'error': 'Expected a multipart/form-data upload'}), 415
+
     try:
         # Check if file is present
         if 'file' not in request.files:
@@ -239,7 +309,7 @@ def upload_paper():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
 
-        if not allowed_file(file.filename):
+        if not allowed_file(file.filename) or not file.stream.is_pdf():
             return jsonify({'error': 'Invalid file type. Only PDF files are allowed'}), 400
 
         # Generate unique IDs
@@ -250,14 +320,15 @@ def upload_paper():
         filename = secure_filename(file.filename)
         pdf_filename = f"{paper_id}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], pdf_filename)
-        file.save(filepath)
 
-        # Get file size
-        file_size = os.path.getsize(filepath)
+        # The upload was streamed to a temp file in the upload folder while
+        # the form was parsed, so rename it rather than copying the bytes
+        file_size = file.stream.seek(0, os.SEEK_END)
+        file.stream.close()
+        os.replace(file.stream.name, filepath)
 
         # Create database records
-        db = get_db()
-        try:
+        with db_session() as db:
             # Verify user exists if user_id provided
             if user_id:
                 user = db.query(User).filter_by(id=user_id).first()
@@ -290,166 +361,134 @@ def upload_paper():
                 'message': 'File uploaded successfully'
             }), 200
 
-        except Exception as e:
-            db.rollback()
-            raise
-        finally:
-            db.close()
 
+    except UnsupportedMediaType as e:
+        return jsonify({'error': e.description}), 415
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/analyze/read', methods=['POST'])
-def analyze_paper_read():
+def _start_job(job_id, status, progress):
     """
-    Phase 1: Quick read of paper with Reader Agent (1-2 min)
-    Expects: job_id (analysis_id), topics (array of topic strings)
-    Returns: Initial research ideas for user to review
+    Register a job as running
+
+    Returns:
+        False if a job for this analysis is already running
     """
-    job_id = None
-    db = get_db()
+    with JOB_PROGRESS_LOCK:
+        if job_id in JOB_PROGRESS:
+            return False
+        JOB_PROGRESS[job_id] = (status, progress)
+        return True
 
-    try:
-        data = request.get_json()
-        job_id = data.get('job_id')  # This is the analysis_id
-        topics = data.get('topics', [])
 
-        if not job_id:
-            return jsonify({'error': 'job_id is required'}), 400
+def _set_job_progress(job_id, status, progress):
+    """Update the progress of a running job"""
+    with JOB_PROGRESS_LOCK:
+        JOB_PROGRESS[job_id] = (status, progress)
 
-        # Get analysis record
-        analysis = db.query(Analysis).filter_by(id=job_id).first()
-        if not analysis:
-            return jsonify({'error': 'Analysis not found'}), 404
 
-        if not topics:
-            return jsonify({'error': 'At least one topic must be selected'}), 400
+def _finish_job(job_id):
+    """Forget a job once its final state is in the database"""
+    with JOB_PROGRESS_LOCK:
+        JOB_PROGRESS.pop(job_id, None)
 
-        # Update analysis status
-        analysis.selected_topics = topics
-        analysis.status = 'parsing'
-        analysis.progress = 20
 
-        # Get and store user profile snapshot
-        paper = db.query(Paper).filter_by(id=analysis.paper_id).first()
-        if not paper:
-            raise Exception('Paper not found')
+def _mark_job_failed(job_id, error, topics=None, profile_snapshot=None):
+    """
+    Record a pipeline failure on the analysis so /api/status can report it
+
+    Args:
+        job_id: Analysis ID
+        error: Exception or message to store
+        topics: Selected topics to record with the failure, if the job had
+            not stored its inputs yet
+        profile_snapshot: User profile at analysis time, or None
+    """
+    try:
+        with db_session() as db:
+            analysis = db.query(Analysis).filter_by(id=job_id).first()
+            if analysis:
+                if topics is not None:
+                    _record_reader_inputs(analysis, topics, profile_snapshot)
+                analysis.status = 'error'
+                analysis.error_message = str(error)
+    except Exception as e:
+        print(f"Failed to record error for job {job_id}: {e}")
 
-        if paper.user_id:
-            user = db.query(User).filter_by(id=paper.user_id).first()
-            if user and user.profile:
-                analysis.user_profile_snapshot = user.profile
 
-        db.commit()
+def _record_reader_inputs(analysis, topics, profile_snapshot):
+    """Store a reader job's inputs alongside its final status"""
+    analysis.selected_topics = topics
+    if profile_snapshot:
+        analysis.user_profile_snapshot = profile_snapshot
 
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], paper.pdf_filename)
+
+def _run_reader(job_id, topics, profile_snapshot, filepath):
+    """
+    Background job for phase 1: parse the PDF and run the Reader Agent
+
+    No database session is held during PDF parsing or the model calls, which
+    can take minutes; the job's inputs are written together with its final
+    status in one short session.
+
+    Args:
+        job_id: Analysis ID
+        topics: Selected topic strings
+        profile_snapshot: User profile at analysis time, or None
+        filepath: Path to the uploaded PDF
+    """
+    try:
+        _set_job_progress(job_id, 'parsing', 20)
         paper_text = extract_text_from_pdf(filepath)
 
         if not paper_text:
-            analysis.status = 'error'
-            analysis.error_message = 'Failed to extract text from PDF'
-            db.commit()
-            return jsonify({'error': 'Failed to extract text from PDF'}), 500
+            _mark_job_failed(job_id, 'Failed to extract text from PDF', topics, profile_snapshot)
+            return
 
         # Update status to reading
-        analysis.status = 'reading'
-        analysis.progress = 40
-        db.commit()
+        _set_job_progress(job_id, 'reading', 40)
 
         # Step 2: Reader Agent (Quick analysis)
         reader = ReaderAgent()
         reader_results = reader.analyze_paper(paper_text, topics)
 
         # Store reader output
-        analysis.reader_output = reader_results
-        analysis.status = 'ideas_ready'  # New status: waiting for user to select ideas
-        analysis.progress = 60
-        db.commit()
-
-        return jsonify({
-            'job_id': job_id,
-            'status': 'ideas_ready',
-            'message': 'Initial ideas generated. Please select 3 ideas to research further.',
-            'summary': reader_results.get('summary', []),
-            'methodology': reader_results.get('methodology', []),
-            'concepts': reader_results.get('concepts', []),
-            'matched_user_topics': reader_results.get('matched_user_topics', []),
-            'ideas': reader_results.get('ideas', [])
-        }), 200
+        with db_session() as db:
+            analysis = db.query(Analysis).filter_by(id=job_id).first()
+            _record_reader_inputs(analysis, topics, profile_snapshot)
+            analysis.reader_output = reader_results
+            analysis.status = 'ideas_ready'  # New status: waiting for user to select ideas
+            analysis.progress = 60
+            analysis.error_message = None
 
     except Exception as e:
-        db.rollback()
-        if job_id:
-            try:
-                analysis = db.query(Analysis).filter_by(id=job_id).first()
-                if analysis:
-                    analysis.status = 'error'
-                    analysis.error_message = str(e)
-                    db.commit()
-            except:
-                pass
-        return jsonify({'error': str(e)}), 500
+        print(f"Reader job {job_id} failed: {e}")
+        _mark_job_failed(job_id, e, topics, profile_snapshot)
     finally:
-        db.close()
+        _finish_job(job_id)
 
 
-@app.route('/api/analyze/search', methods=['POST'])
-def analyze_paper_search():
-    """
-    Phase 2: Deep literature search for selected ideas (5-10 min)
-    Expects: job_id (analysis_id), selected_ideas (array of idea indices 0-based)
-    Returns: Final ranked ideas with literature review
+def _run_searcher(job_id, selected_ideas, topics):
     """
-    job_id = None
-    db = get_db()
+    Background job for phase 2: run the Searcher Agent and store ranked ideas
 
+    Args:
+        job_id: Analysis ID
+        selected_ideas: Idea dictionaries chosen by the user
+        topics: Selected topic strings
+    """
     try:
-        data = request.get_json()
-        job_id = data.get('job_id')
-        selected_idea_indices = data.get('selected_ideas', [])
-
-        if not job_id:
-            return jsonify({'error': 'job_id is required'}), 400
-
-        if not selected_idea_indices or len(selected_idea_indices) != 3:
-            return jsonify({'error': 'Please select exactly 3 ideas'}), 400
-
-        # Get analysis record
-        analysis = db.query(Analysis).filter_by(id=job_id).first()
-        if not analysis:
-            return jsonify({'error': 'Analysis not found'}), 404
-
-        if analysis.status != 'ideas_ready':
-            return jsonify({'error': f'Analysis is not ready for search. Current status: {analysis.status}'}), 400
-
-        if not analysis.reader_output or 'ideas' not in analysis.reader_output:
-            return jsonify({'error': 'No ideas found. Please run /api/analyze/read first'}), 400
-
-        # Get selected ideas from reader output
-        all_ideas = analysis.reader_output['ideas']
-        selected_ideas = []
-        for idx in selected_idea_indices:
-            if 0 <= idx < len(all_ideas):
-                selected_ideas.append(all_ideas[idx])
-            else:
-                return jsonify({'error': f'Invalid idea index: {idx}. Valid range: 0-{len(all_ideas)-1}'}), 400
-
-        # Update status to searching
-        analysis.status = 'searching'
-        analysis.progress = 70
-        db.commit()
-
         # Step 3: Searcher Agent (Deep research on selected ideas only)
         print(f"\n{'='*60}")
         print(f"STARTING SEARCHER AGENT")
         print(f"Job ID: {job_id}")
         print(f"Selected ideas count: {len(selected_ideas)}")
-        print(f"Topics: {analysis.selected_topics}")
+        print(f"Topics: {topics}")
         print(f"{'='*60}\n")
 
         searcher = SearcherAgent()
-        final_results = searcher.research_ideas(selected_ideas, analysis.selected_topics)
+        final_results = searcher.research_ideas(selected_ideas, topics)
 
         print(f"\n{'='*60}")
         print(f"SEARCHER AGENT COMPLETED")
@@ -460,96 +499,199 @@ def analyze_paper_search():
                 print(f"  Idea {i+1}: {idea.get('idea', {}).get('title', 'N/A')[:50]} - {papers_count} papers")
         print(f"{'='*60}\n")
 
-        # Store searcher output
-        analysis.searcher_output = final_results
-
-        # Create ResearchIdea records for top 3 ideas
-        # Note: SearcherAgent returns {idea: {...}, novelty_assessment: {...}, etc}
-        # We need to flatten this for storage and API response
-        flattened_ideas = []
-        for rank, idea_data in enumerate(final_results['top_ideas'], 1):
-            # Extract nested idea fields
-            idea = idea_data.get('idea', {})
-
-            # Flatten the structure and round scores to 1 decimal place
-            papers = idea_data.get('papers', [])
-            print(f"DEBUG: Idea '{idea.get('title', 'N/A')}' has {len(papers)} papers")
-
-            flattened_idea = {
-                'title': idea.get('title', ''),
-                'description': idea.get('description', ''),
-                'rationale': idea.get('rationale', ''),
-                'novelty_score': round(idea_data.get('novelty_assessment', {}).get('novelty_score', 0), 1),
-                'doability_score': round(idea_data.get('doability_assessment', {}).get('doability_score', 0), 1),
-                'topic_match_score': round(idea_data.get('topic_match_score', 0), 1),
-                'composite_score': round(idea_data.get('composite_score', 0), 1),
-                'novelty_assessment': idea_data.get('novelty_assessment', {}),
-                'doability_assessment': idea_data.get('doability_assessment', {}),
-                'literature_synthesis': idea_data.get('literature_synthesis', {}),
-                'references': papers[:8]  # Include top 8 papers as references
-            }
-            flattened_ideas.append(flattened_idea)
-
-            research_idea = ResearchIdea(
-                analysis_id=analysis.id,
-                rank=rank,
-                title=flattened_idea['title'],
-                description=flattened_idea['description'],
-                rationale=flattened_idea['rationale'],
-                novelty_score=flattened_idea['novelty_score'],
-                doability_score=flattened_idea['doability_score'],
-                topic_match_score=flattened_idea['topic_match_score'],
-                composite_score=flattened_idea['composite_score'],
-                novelty_assessment=flattened_idea['novelty_assessment'],
-                doability_assessment=flattened_idea['doability_assessment'],
-                literature_synthesis=flattened_idea['literature_synthesis']
-            )
-            db.add(research_idea)
-            db.flush()  # Get the research_idea.id
-
-            # Create Reference records for this idea
-            for ref_data in idea_data.get('papers', []):
-                reference = Reference(
-                    idea_id=research_idea.id,
-                    title=ref_data.get('title', ''),
-                    authors=ref_data.get('authors', []),
-                    year=ref_data.get('year'),
-                    venue=ref_data.get('venue', ''),
-                    abstract=ref_data.get('abstract', ''),
-                    url=ref_data.get('url', ''),
-                    citation_count=ref_data.get('citations', 0),
-                    relevance_category='',  # Not provided by searcher
-                    summary=''  # Not provided by searcher
-                )
-                db.add(reference)
-
-        # Mark analysis as complete
-        analysis.status = 'complete'
-        analysis.progress = 100
-        analysis.completed_at = datetime.utcnow()
-        db.commit()
+        with db_session() as db:
+            analysis = db.query(Analysis).filter_by(id=job_id).first()
+
+            # Store searcher output
+            analysis.searcher_output = final_results
+
+            # Create ResearchIdea records for top 3 ideas
+            # Note: SearcherAgent returns {idea: {...}, novelty_assessment: {...}, etc}
+            # We need to flatten this for storage
+            idea_rows = []
+            reference_rows = []
+            for rank, idea_data in enumerate(final_results['top_ideas'], 1):
+                # Extract nested idea fields
+                idea = idea_data.get('idea', {})
+
+                # Flatten the structure and round scores to 1 decimal place
+                papers = idea_data.get('papers', [])
+                print(f"DEBUG: Idea '{idea.get('title', 'N/A')}' has {len(papers)} papers")
+
+                flattened_idea = {
+                    'title': idea.get('title', ''),
+                    'description': idea.get('description', ''),
+                    'rationale': idea.get('rationale', ''),
+                    'novelty_score': round(idea_data.get('novelty_assessment', {}).get('novelty_score', 0), 1),
+                    'doability_score': round(idea_data.get('doability_assessment', {}).get('doability_score', 0), 1),
+                    'topic_match_score': round(idea_data.get('topic_match_score', 0), 1),
+                    'composite_score': round(idea_data.get('composite_score', 0), 1),
+                    'novelty_assessment': idea_data.get('novelty_assessment', {}),
+                    'doability_assessment': idea_data.get('doability_assessment', {}),
+                    'literature_synthesis': idea_data.get('literature_synthesis', {})
+                }
+
+                # Generate the ID up front so references can point at it without
+                # flushing each idea individually
+                idea_id = str(uuid.uuid4())
+                idea_rows.append({
+                    'id': idea_id,
+                    'analysis_id': analysis.id,
+                    'rank': rank,
+                    'title': flattened_idea['title'],
+                    'description': flattened_idea['description'],
+                    'rationale': flattened_idea['rationale'],
+                    'novelty_score': flattened_idea['novelty_score'],
+                    'doability_score': flattened_idea['doability_score'],
+                    'topic_match_score': flattened_idea['topic_match_score'],
+                    'composite_score': flattened_idea['composite_score'],
+                    'novelty_assessment': flattened_idea['novelty_assessment'],
+                    'doability_assessment': flattened_idea['doability_assessment'],
+                    'literature_synthesis': flattened_idea['literature_synthesis'],
+                    'reference_count': len(papers)
+                })
+
+                # Reference rows for this idea, numbered in search order
+                for position, ref_data in enumerate(papers):
+                    reference_rows.append({
+                        'id': str(uuid.uuid4()),
+                        'idea_id': idea_id,
+                        'position': position,
+                        'title': ref_data.get('title', ''),
+                        'authors': ref_data.get('authors', []),
+                        'year': ref_data.get('year'),
+                        'venue': ref_data.get('venue', ''),
+                        'abstract': ref_data.get('abstract', ''),
+                        'url': ref_data.get('url', ''),
+                        'citation_count': ref_data.get('citations', 0),
+                        'relevance_category': '',  # Not provided by searcher
+                        'summary': ''  # Not provided by searcher
+                    })
+
+            # Bulk insert ideas and references (one executemany each), committed
+            # together with the status update below
+            if idea_rows:
+                db.execute(insert(ResearchIdea), idea_rows)
+            if reference_rows:
+                db.execute(insert(Reference), reference_rows)
+
+            # Mark analysis as complete
+            analysis.status = 'complete'
+            analysis.progress = 100
+            analysis.completed_at = datetime.utcnow()
+
+    except Exception as e:
+        print(f"Searcher job {job_id} failed: {e}")
+        _mark_job_failed(job_id, e)
+    finally:
+        _finish_job(job_id)
 
-        return jsonify({
-            'job_id': job_id,
-            'status': 'complete',
-            'message': 'Deep research complete',
-            'top_ideas': flattened_ideas  # Return flattened structure for UI
-        }), 200
+
+@app.route('/api/analyze/read', methods=['POST'])
+def analyze_paper_read():
+    """
+    Phase 1: Queue a quick read of the paper with Reader Agent (1-2 min)
+    Expects: job_id (analysis_id), topics (array of topic strings)
+    Returns: 202 once queued; poll /api/status/<job_id> until 'ideas_ready',
+             then fetch the ideas from /api/analyses/<job_id>
+    """
+    try:
+        with db_session() as db:
+            data = request.get_json()
+            job_id = data.get('job_id')  # This is the analysis_id
+            topics = data.get('topics', [])
+
+            if not job_id:
+                return jsonify({'error': 'job_id is required'}), 400
+
+            # Get analysis record
+            analysis = db.query(Analysis).filter_by(id=job_id).first()
+            if not analysis:
+                return jsonify({'error': 'Analysis not found'}), 404
+
+            if not topics:
+                return jsonify({'error': 'At least one topic must be selected'}), 400
+
+            # Get user profile snapshot (stored by the job)
+            paper = db.query(Paper).filter_by(id=analysis.paper_id).first()
+            if not paper:
+                return jsonify({'error': 'Paper not found'}), 404
+
+            profile_snapshot = None
+            if paper.user_id:
+                user = db.query(User).filter_by(id=paper.user_id).first()
+                if user and user.profile:
+                    profile_snapshot = user.profile
+
+            if not _start_job(job_id, 'queued', 15):
+                return jsonify({'error': 'Analysis is already running'}), 409
+
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], paper.pdf_filename)
+            EXECUTOR.submit(_run_reader, job_id, topics, profile_snapshot, filepath)
+
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'message': 'Reading paper. Poll /api/status for progress.'
+            }), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analyze/search', methods=['POST'])
+def analyze_paper_search():
+    """
+    Phase 2: Queue deep literature search for selected ideas (5-10 min)
+    Expects: job_id (analysis_id), selected_ideas (array of idea indices 0-based)
+    Returns: 202 once queued; poll /api/status/<job_id> until 'complete',
+             then fetch the ranked ideas from /api/results/<job_id>
+    """
+    try:
+        with db_session() as db:
+            data = request.get_json()
+            job_id = data.get('job_id')
+            selected_idea_indices = data.get('selected_ideas', [])
+
+            if not job_id:
+                return jsonify({'error': 'job_id is required'}), 400
+
+            if not selected_idea_indices or len(selected_idea_indices) != 3:
+                return jsonify({'error': 'Please select exactly 3 ideas'}), 400
+
+            # Get analysis record
+            analysis = db.query(Analysis).filter_by(id=job_id).first()
+            if not analysis:
+                return jsonify({'error': 'Analysis not found'}), 404
+
+            if analysis.status != 'ideas_ready':
+                return jsonify({'error': f'Analysis is not ready for search. Current status: {analysis.status}'}), 400
+
+            if not analysis.reader_output or 'ideas' not in analysis.reader_output:
+                return jsonify({'error': 'No ideas found. Please run /api/analyze/read first'}), 400
+
+            # Get selected ideas from reader output
+            all_ideas = analysis.reader_output['ideas']
+            selected_ideas = []
+            for idx in selected_idea_indices:
+                if 0 <= idx < len(all_ideas):
+                    selected_ideas.append(all_ideas[idx])
+                else:
+                    return jsonify({'error': f'Invalid idea index: {idx}. Valid range: 0-{len(all_ideas)-1}'}), 400
+
+            if not _start_job(job_id, 'searching', 70):
+                return jsonify({'error': 'Analysis is already running'}), 409
+
+            EXECUTOR.submit(_run_searcher, job_id, selected_ideas, analysis.selected_topics)
+
+            return jsonify({
+                'job_id': job_id,
+                'status': 'searching',
+                'message': 'Deep research started. Poll /api/status for progress.'
+            }), 202
 
     except Exception as e:
-        db.rollback()
-        if job_id:
-            try:
-                analysis = db.query(Analysis).filter_by(id=job_id).first()
-                if analysis:
-                    analysis.status = 'error'
-                    analysis.error_message = str(e)
-                    db.commit()
-            except:
-                pass
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/status/<job_id>', methods=['GET'])
@@ -557,8 +699,19 @@ def get_status(job_id):
     """
     Get status of analysis job
     """
-    db = get_db()
-    try:
+    with db_session() as db:
+        # Running jobs report progress from memory
+        with JOB_PROGRESS_LOCK:
+            running = JOB_PROGRESS.get(job_id)
+        if running:
+            status, progress = running
+            return jsonify({
+                'job_id': job_id,
+                'status': status,
+                'progress': progress,
+                'error': None
+            }), 200
+
         analysis = db.query(Analysis).filter_by(id=job_id).first()
 
         if not analysis:
@@ -571,17 +724,13 @@ def get_status(job_id):
             'error': analysis.error_message
         }), 200
 
-    finally:
-        db.close()
-
 
 @app.route('/api/results/<job_id>', methods=['GET'])
 def get_results(job_id):
     """
     Get final results for completed analysis
     """
-    db = get_db()
-    try:
+    with db_session() as db:
         analysis = db.query(Analysis).filter_by(id=job_id).first()
 
         if not analysis:
@@ -593,76 +742,80 @@ def get_results(job_id):
         # Get paper info
         paper = db.query(Paper).filter_by(id=analysis.paper_id).first()
 
-        # Get top ideas from searcher_output and flatten the structure to match /api/analyze/search
-        raw_ideas = analysis.searcher_output.get('top_ideas', []) if analysis.searcher_output else []
-
-        flattened_ideas = []
-        for idea_data in raw_ideas:
-            # Extract nested idea fields
-            idea = idea_data.get('idea', {})
-            papers = idea_data.get('papers', [])
-
-            # Flatten the structure
-            flattened_idea = {
-                'title': idea.get('title', ''),
-                'description': idea.get('description', ''),
-                'rationale': idea.get('rationale', ''),
-                'novelty_score': round(idea_data.get('novelty_assessment', {}).get('novelty_score', 0), 1),
-                'doability_score': round(idea_data.get('doability_assessment', {}).get('doability_score', 0), 1),
-                'topic_match_score': round(idea_data.get('topic_match_score', 0), 1),
-                'composite_score': round(idea_data.get('composite_score', 0), 1),
-                'novelty_assessment': idea_data.get('novelty_assessment', {}),
-                'doability_assessment': idea_data.get('doability_assessment', {}),
-                'literature_synthesis': idea_data.get('literature_synthesis', {}),
-                'references': papers[:8]  # Include top 8 papers as references
-            }
-            flattened_ideas.append(flattened_idea)
+        # Ranked ideas and their references come from the stored rows
+        ideas = (
+            db.query(ResearchIdea)
+            .options(selectinload(ResearchIdea.references))
+            .filter_by(analysis_id=job_id)
+            .order_by(ResearchIdea.rank)
+            .all()
+        )
+
+        ideas_list = []
+        for idea in ideas:
+            idea_dict = idea.to_dict()
+            idea_dict['references'] = [ref.to_dict() for ref in idea.references]
+            ideas_list.append(idea_dict)
 
         return jsonify({
             'job_id': job_id,
             'filename': paper.pdf_filename if paper else '',
             'paper_summary': analysis.reader_output.get('summary', '') if analysis.reader_output else '',
             'concepts': analysis.reader_output.get('concepts', []) if analysis.reader_output else [],
-            'ideas': flattened_ideas
+            'ideas': ideas_list
         }), 200
 
-    finally:
-        db.close()
-
 
 @app.route('/api/papers', methods=['GET'])
 def get_papers():
     """
-    Get list of all uploaded papers with their analyses
+    Get a page of uploaded papers with their analysis counts
+    Query params: limit (default 50, max 200), offset (default 0)
     """
-    db = get_db()
-    try:
-        papers = db.query(Paper).order_by(Paper.upload_timestamp.desc()).all()
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    with db_session() as db:
+        total = db.query(func.count(Paper.id)).scalar()
+
+        # Count analyses in SQL rather than loading each paper's analyses
+        rows = (
+            db.query(Paper, func.count(Analysis.id))
+            .outerjoin(Analysis, Analysis.paper_id == Paper.id)
+            .group_by(Paper.id)
+            .order_by(Paper.upload_timestamp.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
 
         papers_list = []
-        for paper in papers:
+        for paper, analysis_count in rows:
             paper_dict = paper.to_dict()
             # Add analysis count
-            paper_dict['analysis_count'] = len(paper.analyses)
+            paper_dict['analysis_count'] = analysis_count
             papers_list.append(paper_dict)
 
         return jsonify({
             'papers': papers_list,
-            'total': len(papers_list)
+            'total': total,
+            'limit': limit,
+            'offset': offset
         }), 200
 
-    finally:
-        db.close()
-
 
 @app.route('/api/analyses/<analysis_id>', methods=['GET'])
 def get_analysis(analysis_id):
     """
     Get full details of a specific analysis including all research ideas and references
     """
-    db = get_db()
-    try:
-        analysis = db.query(Analysis).filter_by(id=analysis_id).first()
+    with db_session() as db:
+        analysis = (
+            db.query(Analysis)
+            .options(undefer(Analysis.searcher_output))  # Serialized by to_dict
+            .filter_by(id=analysis_id)
+            .first()
+        )
 
         if not analysis:
             return jsonify({'error': 'Analysis not found'}), 404
@@ -672,14 +825,17 @@ def get_analysis(analysis_id):
 
         # Get research ideas with references
         ideas_list = []
-        ideas = db.query(ResearchIdea).filter_by(analysis_id=analysis_id).order_by(ResearchIdea.rank).all()
+        ideas = (
+            db.query(ResearchIdea)
+            .options(selectinload(ResearchIdea.references))  # One query for all references
+            .filter_by(analysis_id=analysis_id)
+            .order_by(ResearchIdea.rank)
+            .all()
+        )
 
         for idea in ideas:
             idea_dict = idea.to_dict()
-
-            # Get references for this idea
-            references = db.query(Reference).filter_by(idea_id=idea.id).all()
-            idea_dict['references'] = [ref.to_dict() for ref in references]
+            idea_dict['references'] = [ref.to_dict() for ref in idea.references]
 
             ideas_list.append(idea_dict)
 
@@ -689,23 +845,25 @@ def get_analysis(analysis_id):
             'ideas': ideas_list
         }), 200
 
-    finally:
-        db.close()
-
 
 @app.route('/api/papers/<paper_id>/analyses', methods=['GET'])
 def get_paper_analyses(paper_id):
     """
     Get all analyses for a specific paper
     """
-    db = get_db()
-    try:
+    with db_session() as db:
         paper = db.query(Paper).filter_by(id=paper_id).first()
 
         if not paper:
             return jsonify({'error': 'Paper not found'}), 404
 
-        analyses = db.query(Analysis).filter_by(paper_id=paper_id).order_by(Analysis.created_at.desc()).all()
+        analyses = (
+            db.query(Analysis)
+            .options(undefer(Analysis.searcher_output))  # Serialized by to_dict
+            .filter_by(paper_id=paper_id)
+            .order_by(Analysis.created_at.desc())
+            .all()
+        )
 
         return jsonify({
             'paper': paper.to_dict(),
@@ -713,17 +871,22 @@ def get_paper_analyses(paper_id):
             'total': len(analyses)
         }), 200
 
-    finally:
-        db.close()
-
 
 if __name__ == '__main__':
     # Create necessary directories
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
-    # Initialize database if needed
-    init_db()
+    # Create tables only when asked (INIT_DB=1), so debug reloads don't
+    # re-run it; use `python database.py` or `alembic upgrade head` otherwise
+    if os.getenv('INIT_DB') == '1':
+        init_db()
+
+    try:
+        check_schema()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # Run Flask app
     app.run(debug=True, port=5001)
@@ -2,35 +2,84 @@
 Database Connection Management
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 import os
 
 # Database URL - using SQLite for MVP
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./research_discovery.db')
+DEFAULT_DATABASE_URL = 'sqlite:///./research_discovery.db'
+DATABASE_URL = os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+IS_SQLITE = DATABASE_URL.startswith('sqlite')
+
+# In-memory SQLite uses a single-connection pool that takes no size options
+_url = make_url(DATABASE_URL)
+IS_SQLITE_MEMORY = IS_SQLITE and _url.database in (None, '', ':memory:')
+
+# Migration scripts, used to check the database is up to date
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic')
+
+# Set SQLITE_WAL=0 to keep the rollback journal (e.g. on network filesystems,
+# where WAL's shared memory does not work)
+SQLITE_WAL = os.getenv('SQLITE_WAL', '1') == '1'
+
+# Keep connections for the request threads plus background jobs
+pool_options = {} if IS_SQLITE_MEMORY else {'pool_size': 10, 'max_overflow': 5}
 
 # Create engine
 # For SQLite, we need check_same_thread=False to allow usage across threads in Flask
 engine = create_engine(
     DATABASE_URL,
-    connect_args={'check_same_thread': False} if DATABASE_URL.startswith('sqlite') else {},
-    echo=False  # Set to True for SQL debugging
+    connect_args={'check_same_thread': False} if IS_SQLITE else {},
+    insertmanyvalues_page_size=1000,  # Rows per batch for bulk inserts
+    # Server databases may drop idle connections; SQLite files cannot
+    pool_pre_ping=not IS_SQLITE,
+    echo=False,  # Set to True for SQL debugging
+    **pool_options
 )
 
+
+if IS_SQLITE:
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Tune each new SQLite connection for concurrent API access
+
+        WAL lets readers (status polling) proceed while a background job
+        writes, and busy_timeout makes writers wait for the lock instead of
+        failing with 'database is locked'. Connections are pooled, so this
+        runs once per connection rather than per request.
+        """
+        cursor = dbapi_connection.cursor()
+        if SQLITE_WAL:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            # Safe with WAL: a crash can lose the last commits but not corrupt
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.close()
+
 # Session factory
-SessionLocal = scoped_session(sessionmaker(
+# Each caller gets its own session (routes and background jobs run on
+# different threads). expire_on_commit=False keeps loaded attributes usable
+# after commit instead of re-selecting every object on next access.
+SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=engine
-))
+    bind=engine,
+    expire_on_commit=False
+)
 
 
 def get_db():
     """
     Get database session
 
-    Usage in Flask routes:
+    Prefer db_session() in Flask routes; use this when the session's
+    lifetime doesn't fit a with block:
         db = get_db()
         try:
             # Use db session
@@ -77,6 +126,39 @@ def init_db():
     print("Database initialized successfully!")
 
 
+def check_schema():
+    """
+    Make sure the database has every Alembic migration applied, so a stale
+    database fails at startup instead of with 'no such column' errors
+
+    Databases without an alembic_version table (empty, or created by
+    init_db from the current models) are accepted as they are.
+
+    Raises:
+        RuntimeError: If the database is stamped with an older or unknown
+            revision; the message says which alembic command fixes it
+    """
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory(ALEMBIC_DIR)
+    head = script.get_current_head()
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+
+    if current is None or current == head:
+        return
+    if current not in {revision.revision for revision in script.walk_revisions()}:
+        raise RuntimeError(
+            f"Database is stamped with unknown revision {current} (expected {head}). "
+            "Run `alembic stamp --purge base` and then `alembic upgrade head`."
+        )
+    raise RuntimeError(
+        f"Database schema is at revision {current} but the code needs {head}. "
+        "Run `alembic upgrade head`."
+    )
+
+
 def drop_db():
     """
     Drop all tables - USE WITH CAUTION
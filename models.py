@@ -2,9 +2,9 @@
 Database Models for Research Discovery Agent
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Numeric, JSON
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Numeric, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from datetime import datetime
 
@@ -91,13 +91,17 @@ class Paper(Base):
 class Analysis(Base):
     """Analysis model - stores paper analysis jobs and results"""
     __tablename__ = 'analyses'
+    __table_args__ = (
+        # Covers lookups by paper_id and listing a paper's analyses by date
+        Index('ix_analyses_paper_id_created_at', 'paper_id', 'created_at'),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     paper_id = Column(String(36), ForeignKey('papers.id'), nullable=False)
     selected_topics = Column(JSON)  # List of topic strings
     user_profile_snapshot = Column(JSON)  # Snapshot of user profile at analysis time
     reader_output = Column(JSON)  # {summary, concepts, findings, limitations, ideas}
-    searcher_output = Column(JSON)  # Intermediate searcher results
+    searcher_output = deferred(Column(JSON))  # Raw searcher results; only loaded on access (undefer it before to_dict)
     status = Column(String(20), default='pending')  # pending, parsing, reading, ideas_ready, searching, complete, error
     progress = Column(Integer, default=0)  # 0-100
     error_message = Column(Text)
@@ -129,7 +133,7 @@ class ResearchIdea(Base):
     __tablename__ = 'research_ideas'
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    analysis_id = Column(String(36), ForeignKey('analyses.id'), nullable=False)
+    analysis_id = Column(String(36), ForeignKey('analyses.id'), nullable=False, index=True)
     rank = Column(Integer)  # 1, 2, 3
     title = Column(String(500))
     description = Column(Text)
@@ -141,6 +145,9 @@ class ResearchIdea(Base):
     topic_match_score = Column(Numeric(3, 1))
     composite_score = Column(Numeric(3, 1))
 
+    # Number of Reference rows, stored at insert time so listings need not count them
+    reference_count = Column(Integer, default=0, server_default='0', nullable=False)
+
     # Assessments (JSON objects)
     novelty_assessment = Column(JSON)  # {explored, maturity, gap, ...}
     doability_assessment = Column(JSON)  # {data_availability, methodology, ...}
@@ -150,7 +157,7 @@ class ResearchIdea(Base):
 
     # Relationships
     analysis = relationship("Analysis", back_populates="ideas")
-    references = relationship("Reference", back_populates="idea", cascade="all, delete-orphan")
+    references = relationship("Reference", back_populates="idea", cascade="all, delete-orphan", order_by="Reference.position")
 
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
@@ -177,7 +184,7 @@ class Reference(Base):
     __tablename__ = 'references'
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    idea_id = Column(String(36), ForeignKey('research_ideas.id'), nullable=False)
+    idea_id = Column(String(36), ForeignKey('research_ideas.id'), nullable=False, index=True)
     title = Column(String(500))
     authors = Column(JSON)  # List of author names
     year = Column(Integer)
@@ -186,6 +193,7 @@ class Reference(Base):
     url = Column(String(500))
     citation_count = Column(Integer)
     relevance_category = Column(String(50))  # 'foundational', 'recent', 'gap'
+    position = Column(Integer)  # Order within the idea's search results
     summary = Column(Text)  # 2-3 sentence summary
     created_at = Column(DateTime, default=datetime.utcnow)
 
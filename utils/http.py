@@ -0,0 +1,18 @@
+"""
+HTTP Client Utility
+Shared keep-alive session so outbound API calls reuse connections
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'ResearchTrailhead/1.0'
+POOL_CONNECTIONS = 8  # Hosts kept in the pool
+POOL_MAXSIZE = 32  # Open connections kept per host
+
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': USER_AGENT})
+
+_adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
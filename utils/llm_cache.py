@@ -0,0 +1,181 @@
+"""
+LLM Response Cache
+Memoizes Gemini responses on disk, keyed by a hash of model, generation config,
+prompt and options
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import functools
+import threading
+
+# Set LLM_CACHE=0 to always call the model
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') != '0'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.llm_cache.sqlite3')
+LLM_CACHE_MAX_ENTRIES = 10000
+# Entries older than this are ignored and evicted, so responses are refreshed
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 60 * 60))  # seconds
+
+_lock = threading.Lock()
+_connection = None
+
+
+def _get_connection():
+    """Open the cache database on first use"""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+    return _connection
+
+
+def cache_key(model, prompt, **options):
+    """
+    Build the cache key for a model call
+
+    Args:
+        model: google.generativeai GenerativeModel; its name and generation
+            config (temperature, response MIME type, ...) are part of the key
+        prompt: Prompt text
+        **options: Extra generate_content options that affect the output
+
+    Returns:
+        Hex digest string
+    """
+    payload = _model_fingerprint(model) + prompt + json.dumps(options, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _model_fingerprint(model):
+    """Model name and generation config, which both change the responses"""
+    generation_config = getattr(model, '_generation_config', None) or {}
+    return model.model_name + json.dumps(generation_config, sort_keys=True, default=str)
+
+
+def get(key):
+    """
+    Look up a cached response
+
+    Returns:
+        Response text, or None on a miss
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - LLM_CACHE_TTL)
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Warning: LLM cache read failed: {e}")
+        return None
+
+
+def put(key, text):
+    """Store a response, evicting expired entries and the oldest beyond the size limit"""
+    if not LLM_CACHE_ENABLED:
+        return
+    try:
+        with _lock:
+            connection = _get_connection()
+            now = time.time()
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, text, now)
+            )
+            connection.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - LLM_CACHE_TTL,)
+            )
+            connection.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (LLM_CACHE_MAX_ENTRIES,)
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: LLM cache write failed: {e}")
+
+
+def cached_generate(model, prompt, parse=None, **options):
+    """
+    Call model.generate_content, reusing a cached response for the same
+    model, prompt and options
+
+    Args:
+        model: google.generativeai GenerativeModel
+        prompt: Prompt text
+        parse: Optional function applied to the response text; the response
+            is only cached if it parses, so bad outputs are retried next time
+        **options: Passed through to generate_content
+
+    Returns:
+        Response text, or parse(text) when parse is given
+    """
+    key = cache_key(model, prompt, **options)
+
+    text = get(key)
+    if text is not None:
+        return parse(text) if parse else text
+
+    text = model.generate_content(prompt, **options).text
+    result = parse(text) if parse else text
+    put(key, text)
+    return result
+
+
+def cached_method(name, cache_if=None, models=(), depends_on=()):
+    """
+    Decorator memoizing an agent method's JSON-serializable result by its
+    arguments, so re-running the same analysis skips every model call
+
+    The key also covers everything the method's output depends on besides
+    its arguments, so editing a prompt or switching models invalidates the
+    cached results instead of serving stale ones.
+
+    The agent's `fallbacks` list is reset before each call; steps that fall
+    back to a default after an API error append to it, and a result from a
+    run with any fallback is returned but not cached.
+
+    Args:
+        name: Namespace for the cache keys, e.g. 'reader.analyze_paper'
+        cache_if: Optional predicate on the result; results failing it (such
+            as an empty idea list) are returned but not cached
+        models: Names of the agent attributes holding the GenerativeModels
+            the method calls; their names and generation configs are keyed
+        depends_on: Other strings the output depends on, such as prompt
+            templates and embedding model names
+
+    Returns:
+        Decorator for methods taking JSON-serializable arguments
+    """
+    static_version = hashlib.sha256('\0'.join(depends_on).encode()).hexdigest()
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            fingerprints = [_model_fingerprint(getattr(self, attr)) for attr in models]
+            payload = json.dumps([static_version, fingerprints, args, kwargs], sort_keys=True)
+            key = name + ':' + hashlib.sha256(payload.encode()).hexdigest()
+
+            text = get(key)
+            if text is not None:
+                print(f"Response cache hit for {name}")
+                return json.loads(text)
+
+            print(f"Response cache miss for {name}")
+            self.fallbacks = []
+            result = method(self, *args, **kwargs)
+            if self.fallbacks:
+                print(f"Not caching {name}: fell back in {', '.join(sorted(set(self.fallbacks)))}")
+            elif cache_if is None or cache_if(result):
+                put(key, json.dumps(result))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,38 @@
+"""
+Rate Limiting Utility
+Token bucket for spacing out requests to rate-limited APIs
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Tokens refill at `rate` per second up to `capacity`. acquire() takes one
+    token, sleeping only as long as needed for it to become available.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, blocking until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Reserve the token now (possibly going negative) so concurrent
+            # callers queue up behind each other instead of racing
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
@@ -5,9 +5,26 @@ Extracts profile data from Google Scholar URLs
 
 import re
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from scholarly import scholarly
 from urllib.parse import urlparse, parse_qs
 
+MAX_PUBLICATIONS = 15
+MAX_FILL_WORKERS = 4
+
+# Alternative keys scholarly has used for the same metric
+CITATION_KEYS = ('citedby', 'cited_by')
+H_INDEX_KEYS = ('hindex', 'h_index')
+
+# Scraped profiles by Scholar user ID, reused for a day; the least recently
+# used are evicted beyond the size limit
+PROFILE_CACHE_TTL = 24 * 60 * 60
+PROFILE_CACHE_MAX_ENTRIES = 256
+_profile_cache = OrderedDict()
+_profile_cache_lock = threading.Lock()
+
 
 def extract_user_id_from_url(scholar_url):
     """
@@ -32,6 +49,78 @@ def extract_user_id_from_url(scholar_url):
         return None
 
 
+def _publication_data(pub):
+    """
+    Read title, year, venue, authors and citations from a scholarly publication
+
+    Returns:
+        Dictionary with publication fields; title is '' when missing
+    """
+    pub_data = {
+        'title': '',
+        'year': '',
+        'citations': 0,
+        'venue': '',
+        'authors': []
+    }
+
+    if 'bib' in pub:
+        bib = pub['bib']
+        pub_data['title'] = bib.get('title', 'Unknown Title')
+        pub_data['year'] = str(bib.get('pub_year', '')) if bib.get('pub_year') else ''
+        pub_data['venue'] = bib.get('venue', '')
+        pub_data['authors'] = bib.get('author', [])
+        if isinstance(pub_data['authors'], str):
+            pub_data['authors'] = [pub_data['authors']]
+
+    pub_data['citations'] = pub.get('num_citations', 0) or pub.get('num_cited_by', 0) or 0
+
+    if pub_data['title'] == 'Unknown Title':
+        pub_data['title'] = ''
+    return pub_data
+
+
+def _basic_publication(pub):
+    """Read publication fields from the profile listing, or None if they cannot be parsed"""
+    try:
+        return _publication_data(pub)
+    except Exception as e:
+        # Skip publications that fail to load
+        print(f"Warning: Could not process publication: {e}")
+        return None
+
+
+def _get_cached_profile(user_id):
+    """Look up a scraped profile, or None if missing or expired"""
+    with _profile_cache_lock:
+        cached = _profile_cache.get(user_id)
+        if not cached:
+            return None
+        if time.time() - cached[0] >= PROFILE_CACHE_TTL:
+            del _profile_cache[user_id]
+            return None
+        _profile_cache.move_to_end(user_id)
+        return cached[1]
+
+
+def _store_cached_profile(user_id, profile):
+    """Cache a scraped profile, evicting the least recently used beyond the limit"""
+    with _profile_cache_lock:
+        _profile_cache[user_id] = (time.time(), profile)
+        _profile_cache.move_to_end(user_id)
+        while len(_profile_cache) > PROFILE_CACHE_MAX_ENTRIES:
+            _profile_cache.popitem(last=False)
+
+
+def _fill_publication(pub):
+    """Fetch full publication details, or None if the request fails"""
+    try:
+        return _publication_data(scholarly.fill(pub))
+    except Exception as fill_error:
+        print(f"Warning: Could not fill publication details: {fill_error}")
+        return None
+
+
 def scrape_scholar_profile(scholar_url):
     """
     Scrape Google Scholar profile data
@@ -55,6 +144,11 @@ def scrape_scholar_profile(scholar_url):
         user_id = extract_user_id_from_url(scholar_url)
         if not user_id:
             raise ValueError("Could not extract user ID from Google Scholar URL. Please ensure the URL contains 'user=' parameter.")
+
+        cached = _get_cached_profile(user_id)
+        if cached:
+            print(f"Using cached Google Scholar profile for: {user_id}")
+            return cached
         
         # Search for author by ID
         # Add delay to avoid rate limiting
@@ -76,86 +170,36 @@ def scrape_scholar_profile(scholar_url):
         # Extract interests
         interests = author.get('interests', [])
         
-        # Extract citation metrics
-        h_index = 0
-        total_citations = 0
-        
-        # Try different possible keys for citation metrics
-        if 'citedby' in author:
-            total_citations = author['citedby']
-        elif 'cited_by' in author:
-            total_citations = author['cited_by']
-        
-        # Get h-index
-        if 'hindex' in author:
-            h_index = author['hindex']
-        elif 'h_index' in author:
-            h_index = author['h_index']
-        elif 'indices' in author and 'h' in author['indices']:
-            h_index = author['indices']['h']
-        
-        # Extract publications
-        publications = []
-        pub_list = author.get('publications', [])
+        # Extract citation metrics, trying each possible key
+        total_citations = next((author[k] for k in CITATION_KEYS if k in author), 0)
+        h_index = next(
+            (author[k] for k in H_INDEX_KEYS if k in author),
+            author.get('indices', {}).get('h', 0)
+        )
         
-        if pub_list:
-            # Limit to top 15 publications to avoid timeout
-            for pub in pub_list[:15]:
-                try:
-                    # Get basic info first (faster)
-                    pub_data = {
-                        'title': '',
-                        'year': '',
-                        'citations': 0,
-                        'venue': '',
-                        'authors': []
-                    }
-                    
-                    # Try to get data from pub dict directly first
-                    if 'bib' in pub:
-                        bib = pub['bib']
-                        pub_data['title'] = bib.get('title', 'Unknown Title')
-                        pub_data['year'] = str(bib.get('pub_year', '')) if bib.get('pub_year') else ''
-                        pub_data['venue'] = bib.get('venue', '')
-                        pub_data['authors'] = bib.get('author', [])
-                        if isinstance(pub_data['authors'], str):
-                            pub_data['authors'] = [pub_data['authors']]
-                    
-                    pub_data['citations'] = pub.get('num_citations', 0) or pub.get('num_cited_by', 0) or 0
-                    
-                    # Only try to fill if we don't have title
-                    if not pub_data['title'] or pub_data['title'] == 'Unknown Title':
-                        try:
-                            time.sleep(0.3)  # Small delay to avoid rate limiting
-                            filled_pub = scholarly.fill(pub)
-                            if 'bib' in filled_pub:
-                                bib = filled_pub['bib']
-                                pub_data['title'] = bib.get('title', 'Unknown Title')
-                                pub_data['year'] = str(bib.get('pub_year', '')) if bib.get('pub_year') else ''
-                                pub_data['venue'] = bib.get('venue', '')
-                                pub_data['authors'] = bib.get('author', [])
-                                if isinstance(pub_data['authors'], str):
-                                    pub_data['authors'] = [pub_data['authors']]
-                            pub_data['citations'] = filled_pub.get('num_citations', 0) or filled_pub.get('num_cited_by', 0) or 0
-                        except Exception as fill_error:
-                            # If fill fails, skip this publication
-                            print(f"Warning: Could not fill publication details: {fill_error}")
-                            continue
-                    
-                    # Only add if we have at least a title
-                    if pub_data['title'] and pub_data['title'] != 'Unknown Title':
-                        publications.append(pub_data)
-                        
-                except Exception as e:
-                    # Skip publications that fail to load
-                    print(f"Warning: Could not process publication: {e}")
-                    continue
+        # Extract publications, limited to the top ones to avoid timeout.
+        # Basic info comes with the profile; publications missing a title
+        # are filled concurrently since each fill is a separate request.
+        # A publication that fails to parse is skipped, not the whole profile.
+        publications = [_basic_publication(pub) for pub in author.get('publications', [])[:MAX_PUBLICATIONS]]
+
+        to_fill = [i for i, pub_data in enumerate(publications) if pub_data and not pub_data['title']]
+        if to_fill:
+            pub_list = author['publications']
+            with ThreadPoolExecutor(max_workers=min(len(to_fill), MAX_FILL_WORKERS)) as executor:
+                filled = executor.map(_fill_publication, [pub_list[i] for i in to_fill])
+                for i, filled_data in zip(to_fill, filled):
+                    if filled_data:
+                        publications[i] = filled_data
+
+        # Only keep publications with at least a title
+        publications = [pub_data for pub_data in publications if pub_data and pub_data['title']]
         
         # Ensure we have at least basic data
         if not name or name == 'Unknown':
             raise ValueError("Could not extract author name from Google Scholar profile")
         
-        return {
+        profile = {
             'name': name,
             'affiliation': affiliation,
             'interests': interests,
@@ -163,6 +207,10 @@ def scrape_scholar_profile(scholar_url):
             'h_index': h_index,
             'total_citations': total_citations
         }
+
+        _store_cached_profile(user_id, profile)
+
+        return profile
         
     except ValueError:
         # Re-raise ValueError as-is (these are our custom errors)
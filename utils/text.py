@@ -0,0 +1,29 @@
+"""
+Text Utility
+Keyword tokenization shared by the agents for topic matching
+"""
+
+import re
+
+# Lowercase words of 4+ letters; shorter words are too generic to match on
+WORD_RE = re.compile(r"[a-z]{4,}")
+
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how',
+    'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this',
+    'to', 'using', 'via', 'with', 'about', 'based', 'between', 'their',
+    'these', 'those', 'through', 'towards', 'when', 'which', 'while'
+})
+
+
+def keywords(text):
+    """
+    Extract the set of keywords from text
+
+    Args:
+        text: Any string
+
+    Returns:
+        Frozenset of lowercase words of 4+ letters, excluding stopwords
+    """
+    return frozenset(WORD_RE.findall(text.lower())) - STOPWORDS
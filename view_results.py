@@ -3,145 +3,406 @@ View Results from Database
 Simple script to query and display analysis results
 """
 
-from database import get_db
-from models import Paper, Analysis, ResearchIdea, Reference
-import json
-
-def view_all_papers():
-    """List all papers in database"""
-    db = get_db()
-    try:
-        papers = db.query(Paper).all()
-        print(f"\n{'='*60}")
-        print(f"Total Papers: {len(papers)}")
-        print(f"{'='*60}\n")
-
-        for paper in papers:
-            print(f"ID: {paper.id}")
-            print(f"File: {paper.pdf_filename}")
-            print(f"Uploaded: {paper.upload_timestamp}")
-            print(f"Analyses: {len(paper.analyses)}")
-            print("-" * 60)
-    finally:
-        db.close()
-
-
-def view_all_analyses():
-    """List all analyses"""
-    db = get_db()
-    try:
-        analyses = db.query(Analysis).order_by(Analysis.created_at.desc()).all()
-        print(f"\n{'='*60}")
-        print(f"Total Analyses: {len(analyses)}")
-        print(f"{'='*60}\n")
-
-        for analysis in analyses:
-            print(f"ID: {analysis.id}")
-            print(f"Status: {analysis.status}")
-            print(f"Progress: {analysis.progress}%")
-            print(f"Topics: {', '.join(analysis.selected_topics) if analysis.selected_topics else 'None'}")
-            print(f"Created: {analysis.created_at}")
-            if analysis.status == 'complete':
-                print(f"Ideas generated: {len(analysis.ideas)}")
-            print("-" * 60)
-    finally:
-        db.close()
-
-
-def view_analysis_details(analysis_id):
-    """View detailed results for a specific analysis"""
-    db = get_db()
-    try:
-        analysis = db.query(Analysis).filter_by(id=analysis_id).first()
+import os
+import sys
+import shutil
+import hashlib
+from collections import defaultdict
 
-        if not analysis:
-            print(f"Analysis {analysis_id} not found")
-            return
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only, undefer
 
-        print(f"\n{'='*60}")
-        print(f"Analysis: {analysis.id}")
-        print(f"{'='*60}\n")
-
-        print(f"Status: {analysis.status}")
-        print(f"Topics: {', '.join(analysis.selected_topics) if analysis.selected_topics else 'None'}")
-
-        if analysis.reader_output:
-            print(f"\nPaper Summary:")
-            print(f"{analysis.reader_output.get('summary', 'N/A')}")
-
-            concepts = analysis.reader_output.get('concepts', [])
-            if concepts:
-                print(f"\nKey Concepts: {', '.join(concepts[:5])}")
-
-        # Research ideas
-        ideas = db.query(ResearchIdea).filter_by(analysis_id=analysis_id).order_by(ResearchIdea.rank).all()
-
-        print(f"\n{'='*60}")
-        print(f"Research Ideas ({len(ideas)})")
-        print(f"{'='*60}\n")
-
-        for idea in ideas:
-            print(f"#{idea.rank}: {idea.title}")
-            print(f"  Description: {idea.description}")
-            print(f"  Scores - Novelty: {idea.novelty_score}, Doability: {idea.doability_score}, "
-                  f"Topic Match: {idea.topic_match_score}")
-            print(f"  Composite: {idea.composite_score}")
-
-            # References
-            references = db.query(Reference).filter_by(idea_id=idea.id).all()
-            print(f"  References: {len(references)}")
-            print()
+from database import db_session, check_schema
+from models import Paper, Analysis, ResearchIdea, Reference
+import orjson
 
-    finally:
-        db.close()
+EXPORT_DIR = 'results'
 
+# Exported files are memoized here, keyed on the analysis and a freshness token
+EXPORT_CACHE_DIR = os.path.join(EXPORT_DIR, '.cache')
+EXPORT_CACHE_MAX_FILES = 200
 
-def export_analysis_to_json(analysis_id, output_file=None):
-    """Export analysis results to JSON file"""
-    db = get_db()
-    try:
-        analysis = db.query(Analysis).filter_by(id=analysis_id).first()
+# Directories already created by this process
+_ENSURED_DIRS = set()
 
-        if not analysis:
-            print(f"Analysis {analysis_id} not found")
-            return
+SEP_EQ = '=' * 60
+SEP_DASH = '-' * 60
 
-        # Build complete result object
-        result = analysis.to_dict()
+# Listings are written to stdout in batches of this many rows
+OUTPUT_BATCH_ROWS = 100
 
-        # Add paper info
-        paper = db.query(Paper).filter_by(id=analysis.paper_id).first()
-        result['paper'] = paper.to_dict() if paper else None
+# Columns exported for ideas and references, in the key order of their to_dict
+IDEA_EXPORT_COLUMNS = (
+    ResearchIdea.id, ResearchIdea.analysis_id, ResearchIdea.rank, ResearchIdea.title,
+    ResearchIdea.description, ResearchIdea.rationale,
+    ResearchIdea.novelty_score, ResearchIdea.doability_score,
+    ResearchIdea.topic_match_score, ResearchIdea.composite_score,
+    ResearchIdea.novelty_assessment, ResearchIdea.doability_assessment,
+    ResearchIdea.literature_synthesis, ResearchIdea.created_at
+)
+REFERENCE_EXPORT_COLUMNS = (
+    Reference.id, Reference.idea_id, Reference.title, Reference.authors, Reference.year,
+    Reference.venue, Reference.abstract, Reference.url, Reference.citation_count,
+    Reference.relevance_category, Reference.summary, Reference.created_at
+)
+SCORE_KEYS = ('novelty_score', 'doability_score', 'topic_match_score', 'composite_score')
 
-        # Add ideas with references
-        ideas = db.query(ResearchIdea).filter_by(analysis_id=analysis_id).order_by(ResearchIdea.rank).all()
-        result['ideas'] = []
 
-        for idea in ideas:
-            idea_dict = idea.to_dict()
-            references = db.query(Reference).filter_by(idea_id=idea.id).all()
-            idea_dict['references'] = [ref.to_dict() for ref in references]
-            result['ideas'].append(idea_dict)
+def _write_lines(lines):
+    """Write collected output lines to stdout in one call and clear the list"""
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        lines.clear()
 
-        # Save to file
-        if not output_file:
-            output_file = f"results/analysis_{analysis_id}.json"
 
-        import os
-        os.makedirs('results', exist_ok=True)
+def view_all_papers(db):
+    """List all papers in database"""
+    # Count analyses in SQL and fetch only the printed columns
+    analysis_count = (
+        select(func.count(Analysis.id))
+        .where(Analysis.paper_id == Paper.id)
+        .correlate(Paper)
+        .scalar_subquery()
+    )
+    papers = db.query(Paper.id, Paper.pdf_filename, Paper.upload_timestamp, analysis_count).all()
+
+    # Collect the output and write it in batches rather than printing line by line
+    lines = [f"\n{SEP_EQ}"]
+    lines.append(f"Total Papers: {len(papers)}")
+    lines.append(f"{SEP_EQ}\n")
+
+    for row, (paper_id, pdf_filename, upload_timestamp, n_analyses) in enumerate(papers, 1):
+        lines.append(f"ID: {paper_id}")
+        lines.append(f"File: {pdf_filename}")
+        lines.append(f"Uploaded: {upload_timestamp}")
+        lines.append(f"Analyses: {n_analyses}")
+        lines.append(SEP_DASH)
+        if row % OUTPUT_BATCH_ROWS == 0:
+            _write_lines(lines)
+
+    _write_lines(lines)
+
+
+def _joined_topics(dialect_name):
+    """
+    Build a SQL expression joining an analysis's selected_topics with ', '
+
+    Args:
+        dialect_name: Name of the database dialect in use
+
+    Returns:
+        Correlated scalar subquery, or None if the dialect has no JSON array
+        functions and the topics must be joined in Python
+    """
+    if dialect_name == 'sqlite':
+        topics = func.json_each(Analysis.selected_topics).table_valued('value')
+        joined = func.group_concat(topics.c.value, ', ')
+    elif dialect_name == 'postgresql':
+        topics = func.json_array_elements_text(Analysis.selected_topics).table_valued('value')
+        joined = func.string_agg(topics.c.value, ', ')
+    else:
+        return None
 
-        with open(output_file, 'w') as f:
-            json.dump(result, f, indent=2)
+    return select(joined).select_from(topics).correlate(Analysis).scalar_subquery()
 
-        print(f"Analysis exported to: {output_file}")
 
-    finally:
-        db.close()
+def view_all_analyses(db):
+    """List all analyses"""
+    # Count ideas in SQL and skip the large JSON output columns
+    idea_count = (
+        select(func.count(ResearchIdea.id))
+        .where(ResearchIdea.analysis_id == Analysis.id)
+        .correlate(Analysis)
+        .scalar_subquery()
+    )
+    # Join topics in the database where it can, falling back to the JSON list
+    topics = _joined_topics(db.get_bind().dialect.name)
+    if topics is None:
+        topics = Analysis.selected_topics
+
+    analyses = (
+        db.query(
+            Analysis.id, Analysis.status, Analysis.progress,
+            topics, Analysis.created_at, idea_count
+        )
+        .order_by(Analysis.created_at.desc())
+        .all()
+    )
+
+    lines = [f"\n{SEP_EQ}"]
+    lines.append(f"Total Analyses: {len(analyses)}")
+    lines.append(f"{SEP_EQ}\n")
+
+    for row, (analysis_id, status, progress, topics, created_at, n_ideas) in enumerate(analyses, 1):
+        if isinstance(topics, list):
+            topics = ', '.join(topics)
+        lines.append(f"ID: {analysis_id}")
+        lines.append(f"Status: {status}")
+        lines.append(f"Progress: {progress}%")
+        lines.append(f"Topics: {topics or 'None'}")
+        lines.append(f"Created: {created_at}")
+        if status == 'complete':
+            lines.append(f"Ideas generated: {n_ideas}")
+        lines.append(SEP_DASH)
+        if row % OUTPUT_BATCH_ROWS == 0:
+            _write_lines(lines)
+
+    _write_lines(lines)
+
+
+def view_analysis_details(db, analysis_id):
+    """View detailed results for a specific analysis"""
+    # Load only the printed columns, skipping the large JSON outputs
+    analysis = (
+        db.query(Analysis)
+        .options(load_only(Analysis.id, Analysis.status, Analysis.selected_topics, Analysis.reader_output))
+        .filter_by(id=analysis_id)
+        .first()
+    )
+
+    if not analysis:
+        print(f"Analysis {analysis_id} not found")
+        return
+
+    lines = [f"\n{SEP_EQ}"]
+    lines.append(f"Analysis: {analysis.id}")
+    lines.append(f"{SEP_EQ}\n")
+
+    lines.append(f"Status: {analysis.status}")
+    lines.append(f"Topics: {', '.join(analysis.selected_topics) if analysis.selected_topics else 'None'}")
+
+    if analysis.reader_output:
+        lines.append(f"\nPaper Summary:")
+        lines.append(f"{analysis.reader_output.get('summary', 'N/A')}")
+
+        concepts = analysis.reader_output.get('concepts', [])
+        if concepts:
+            lines.append(f"\nKey Concepts: {', '.join(concepts[:5])}")
+
+    # Research ideas
+    ideas = (
+        db.query(ResearchIdea)
+        .options(load_only(
+            ResearchIdea.id, ResearchIdea.rank, ResearchIdea.title, ResearchIdea.description,
+            ResearchIdea.novelty_score, ResearchIdea.doability_score,
+            ResearchIdea.topic_match_score, ResearchIdea.composite_score,
+            ResearchIdea.reference_count
+        ))
+        .filter_by(analysis_id=analysis_id)
+        .order_by(ResearchIdea.rank)
+        .all()
+    )
+
+    lines.append(f"\n{SEP_EQ}")
+    lines.append(f"Research Ideas ({len(ideas)})")
+    lines.append(f"{SEP_EQ}\n")
+
+    for idea in ideas:
+        lines.append(f"#{idea.rank}: {idea.title}")
+        lines.append(f"  Description: {idea.description}")
+        lines.append(f"  Scores - Novelty: {idea.novelty_score}, Doability: {idea.doability_score}, "
+                     f"Topic Match: {idea.topic_match_score}")
+        lines.append(f"  Composite: {idea.composite_score}")
+
+        # References
+        lines.append(f"  References: {idea.reference_count}")
+        lines.append('')
+
+    _write_lines(lines)
+
+
+def _ensure_dir(path):
+    """Create a directory once per process"""
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+
+def _export_row(row):
+    """
+    Convert a Core result row to the dict the model's to_dict would build
+
+    Args:
+        row: RowMapping selected from IDEA_EXPORT_COLUMNS or REFERENCE_EXPORT_COLUMNS
+
+    Returns:
+        JSON-serializable dict
+    """
+    data = dict(row)
+    for key in SCORE_KEYS:
+        if key in data:
+            data[key] = float(data[key]) if data[key] else None
+    data['created_at'] = data['created_at'].isoformat() if data['created_at'] else None
+    return data
+
+
+def _iter_export_ideas(db, analysis_id):
+    """
+    Yield idea dicts with their references for an export
+
+    Reads plain rows with Core selects, skipping ORM instance construction,
+    and fetches references with one query per batch of ideas.
+
+    Args:
+        db: Database session
+        analysis_id: ID of the analysis
+
+    Yields:
+        Idea dicts with a 'references' list, ordered by rank
+    """
+    ideas = db.execute(
+        select(*IDEA_EXPORT_COLUMNS)
+        .where(ResearchIdea.analysis_id == analysis_id)
+        .order_by(ResearchIdea.rank)
+        .execution_options(yield_per=100)
+    ).mappings()
+
+    for batch in ideas.partitions():
+        batch = [_export_row(row) for row in batch]
+
+        references = defaultdict(list)
+        rows = db.execute(
+            select(*REFERENCE_EXPORT_COLUMNS)
+            .where(Reference.idea_id.in_([idea['id'] for idea in batch]))
+            .order_by(Reference.idea_id, Reference.position)
+        ).mappings()
+        for row in rows:
+            references[row['idea_id']].append(_export_row(row))
+
+        for idea in batch:
+            idea['references'] = references.get(idea['id'], [])
+            yield idea
+
+
+def _export_cache_path(db, analysis_id, envelope):
+    """
+    Build the cache file path for an analysis export
+
+    The key hashes the serialized analysis and paper, so any edit to them
+    (topics, reader output, status, paper fields, ...) produces a new key.
+    Ideas and references are only ever inserted, together with the status
+    change that completes the analysis, so their count and newest timestamp
+    stand in for their content.
+
+    Args:
+        db: Database session
+        analysis_id: ID of the analysis being exported
+        envelope: Serialized analysis and paper, as written to the export
+
+    Returns:
+        Path of the cached export under EXPORT_CACHE_DIR
+    """
+    ideas_token = (
+        db.query(
+            func.count(func.distinct(ResearchIdea.id)),
+            func.max(ResearchIdea.created_at),
+            func.count(Reference.id),
+            func.max(Reference.created_at),
+        )
+        .select_from(ResearchIdea)
+        .outerjoin(Reference, Reference.idea_id == ResearchIdea.id)
+        .filter(ResearchIdea.analysis_id == analysis_id)
+        .one()
+    )
+    digest = hashlib.blake2b(envelope, digest_size=16)
+    digest.update(repr(tuple(ideas_token)).encode())
+    return os.path.join(EXPORT_CACHE_DIR, f"{digest.hexdigest()}.json")
+
+
+def _prune_export_cache():
+    """Delete the least recently used exports beyond EXPORT_CACHE_MAX_FILES"""
+    try:
+        entries = [entry for entry in os.scandir(EXPORT_CACHE_DIR) if entry.name.endswith('.json')]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[EXPORT_CACHE_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def export_analysis_to_json(db, analysis_id, output_file=None):
+    """
+    Export analysis results to JSON file
+
+    Ideas are written one at a time as they are loaded, so memory stays
+    bounded however many ideas and references the analysis has. Repeated
+    exports of unchanged results are copied from EXPORT_CACHE_DIR.
+    """
+    # Fetch the analysis and its paper in one round trip
+    row = (
+        db.query(Analysis, Paper)
+        .options(undefer(Analysis.searcher_output))
+        .outerjoin(Paper, Paper.id == Analysis.paper_id)
+        .filter(Analysis.id == analysis_id)
+        .first()
+    )
+
+    if not row:
+        print(f"Analysis {analysis_id} not found")
+        return
+
+    analysis, paper = row
+
+    if not output_file:
+        output_file = os.path.join(EXPORT_DIR, f"analysis_{analysis_id}.json")
+
+    _ensure_dir(os.path.dirname(output_file) or '.')
+    _ensure_dir(EXPORT_CACHE_DIR)
+
+    # Build result object without the ideas
+    result = analysis.to_dict()
+
+    # Add paper info
+    result['paper'] = paper.to_dict() if paper else None
+    envelope = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+
+    cache_path = _export_cache_path(db, analysis_id, envelope)
+    if os.path.exists(cache_path):
+        # Touch the entry so pruning keeps recently used exports
+        os.utime(cache_path)
+        shutil.copyfile(cache_path, output_file)
+        print(f"Analysis exported to: {output_file} (cached)")
+        return
+
+    # Write to a temp file first so an interrupted export never leaves a
+    # partial cache entry behind
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        # Write the envelope without its closing brace, then append the ideas
+        # array, indented to match OPT_INDENT_2 output for the whole object
+        f.write(envelope[:-2])
+        f.write(b',\n  "ideas": [')
+
+        separator = b'\n    '
+        for idea_dict in _iter_export_ideas(db, analysis_id):
+            f.write(separator)
+            f.write(orjson.dumps(idea_dict, option=orjson.OPT_INDENT_2).replace(b'\n', b'\n    '))
+            separator = b',\n    '
+
+        # An empty array is written as [] by OPT_INDENT_2
+        f.write(b'\n  ]\n}' if separator != b'\n    ' else b']\n}')
+
+    os.replace(tmp_path, cache_path)
+    shutil.copyfile(cache_path, output_file)
+    _prune_export_cache()
+
+    print(f"Analysis exported to: {output_file}")
+
+
+# Command name -> (function, required arguments, maximum arguments)
+COMMANDS = {
+    'papers': (view_all_papers, 0, 0),
+    'analyses': (view_all_analyses, 0, 0),
+    'view': (view_analysis_details, 1, 1),
+    'export': (export_analysis_to_json, 1, 2),
+}
 
 
 if __name__ == '__main__':
-    import sys
-
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python view_results.py papers              # List all papers")
@@ -151,21 +412,22 @@ if __name__ == '__main__':
         sys.exit(1)
 
     command = sys.argv[1]
-
-    if command == 'papers':
-        view_all_papers()
-    elif command == 'analyses':
-        view_all_analyses()
-    elif command == 'view':
-        if len(sys.argv) < 3:
-            print("Error: analysis_id required")
-            sys.exit(1)
-        view_analysis_details(sys.argv[2])
-    elif command == 'export':
-        if len(sys.argv) < 3:
-            print("Error: analysis_id required")
-            sys.exit(1)
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
-        export_analysis_to_json(sys.argv[2], output_file)
-    else:
+    if command not in COMMANDS:
         print(f"Unknown command: {command}")
+        sys.exit(1)
+
+    handler, required_args, max_args = COMMANDS[command]
+    args = sys.argv[2:2 + max_args]
+    if len(args) < required_args:
+        print("Error: analysis_id required")
+        sys.exit(1)
+
+    try:
+        check_schema()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # One session (and pooled connection) for the whole command
+    with db_session() as db:
+        handler(db, *args)